@@ -0,0 +1,168 @@
+import os
+
+# benchmarks draw into an off-screen display, so they run the same with or without a monitor
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import pygame
+import newrun
+from src import entity, sounds, render
+
+# how much slower than the baseline a phase may get before it counts as a regression
+tolerance = .25
+
+
+def crates(game, number=100):
+    """number crates parachuting in from above the screen"""
+    for each in range(number):
+        game.real_entities.add(entity.Crate(random.randint(0, 1400), random.randint(-400, 0), game.visuals, 0))
+
+
+def dynamite(game, number=50):
+    """about number sticks of dynamite lit at once, with an eighth of them going off every tick so that every
+    tick after the first few times a blast"""
+
+    def light():
+        for each in range(number // 8):
+            stick = entity.Dynamite(random.randint(100, 1300), random.randint(100, 300), random.random() < .5,
+                                    game.particles, game.real_entities, game.world, None)
+            stick.fuse = 200
+            game.real_entities.add(stick)
+    return light
+
+
+def particles(game, number=10000):
+    """number particles flung up from the middle of the map, topped back up every tick as they die"""
+    source = entity.Particles(game.player1, [(255, 255, 255), (255, 255, 0), (255, 150, 0)], game.particles)
+
+    def top_up():
+        missing = number - len(game.particles)
+        if missing > 0:
+            # the player moves its particle offsets about as it updates
+            game.player1.px_offset = 500
+            game.player1.py_offset = 100
+            source.spawn(missing, (2, 2), 20, 20, True)
+    top_up()
+    return top_up
+
+
+def arrows(game, number=200):
+    """a volley of number arrows fired across the map"""
+    for each in range(number):
+        game.real_entities.add(entity.Arrow(random.randint(0, 200), random.randint(0, 300), random.randint(0, 80),
+                                            random.randint(20, 65), game.real_entities, None))
+
+
+def destruction(game, blasts=4):
+    """a map filled with dirt that has blasts holes blown in it every tick"""
+
+    game.world.fill_region(0, 0, game.world.length, game.world.height, 1)
+
+    def blast():
+        for each in range(blasts):
+            game.world.destroy(random.randint(0, game.world.length * 16), random.randint(0, game.world.height * 16), 2, 3)
+    return blast
+
+
+scenarios = {"crates": crates, "dynamite": dynamite, "particles": particles, "arrows": arrows, "destruction": destruction}
+
+
+def percentiles(samples):
+    """summary of a list of timings in milliseconds"""
+
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+    return {"p50": at(.5), "p90": at(.9), "p99": at(.99), "max": ordered[-1], "mean": sum(ordered) / len(ordered)}
+
+
+def run(name, ticks, seed, size, scaler):
+    """times the update, collision and draw phases of every tick of a scenario"""
+
+    length, height = size
+    game = newrun.Game(scaler, 0, pygame.sprite.Group(), length, height, seed)
+    every_tick = scenarios[name](game)
+
+    timings = {"update": [], "collision": [], "draw": []}
+    for tick in range(ticks):
+        start = time.perf_counter()
+        game.space.collide(game.real_entities)
+        collided = time.perf_counter()
+        if every_tick is not None:
+            every_tick()
+        game.visuals.update()
+        game.particles.update()
+        game.real_entities.update()
+        updated = time.perf_counter()
+        game.render(scaler.surface)
+        drawn = time.perf_counter()
+
+        timings["collision"].append((collided - start) * 1000)
+        timings["update"].append((updated - collided) * 1000)
+        timings["draw"].append((drawn - updated) * 1000)
+
+    result = {"ticks": ticks, "entities": len(game.real_entities), "particles": len(game.particles)}
+    for phase in timings:
+        result[phase] = percentiles(timings[phase])
+    game.end()
+    return result
+
+
+def compare(results, baseline):
+    """lists every phase whose median time grew by more than the tolerance over the baseline"""
+
+    regressions = []
+    for name in results:
+        if name not in baseline:
+            continue
+        for phase in ("update", "collision", "draw"):
+            before = baseline[name][phase]["p50"]
+            after = results[name][phase]["p50"]
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append((name, phase, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="times the game's update, collision and draw phases in stress scenes")
+    parser.add_argument("scenarios", nargs="*", default=sorted(scenarios), help="scenarios to run, all of them by default")
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, nargs=2, default=(90, 40), metavar=("LENGTH", "HEIGHT"))
+    parser.add_argument("--output", default="benchmark.json", help="where to write the results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    arguments = parser.parse_args()
+
+    sounds.bank.muted = True
+    scaler = render.Scaler(pygame.display.set_mode(render.resolution))
+
+    results = {}
+    for name in arguments.scenarios:
+        results[name] = run(name, arguments.ticks, arguments.seed, arguments.size, scaler)
+        line = name.ljust(12)
+        for phase in ("update", "collision", "draw"):
+            line += "  %s p50 %7.3fms p99 %7.3fms" % (phase, results[name][phase]["p50"], results[name][phase]["p99"])
+        print(line)
+
+    with open(arguments.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file))
+        for name, phase, before, after in regressions:
+            print("regression: %s %s p50 %.3fms -> %.3fms" % (name, phase, before, after))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
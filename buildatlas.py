@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import pygame
+from src import textures
+
+# directories whose images are packed, and the largest image that is worth packing
+directories = ["assets/animations", "assets/items", "assets/numbers", "assets/displays", "assets/blocks"]
+largest = 256
+
+
+def images(roots, limit):
+    """(path, surface) for every png under the roots no bigger than limit on either side"""
+
+    found = []
+    for root in roots:
+        for directory, folders, files in os.walk(root):
+            folders.sort()
+            for filename in sorted(files):
+                if filename.endswith(".png"):
+                    path = os.path.join(directory, filename).replace(os.sep, "/")
+                    image = pygame.image.load(path)
+                    if max(image.get_size()) <= limit:
+                        found.append((path, image))
+    return found
+
+
+def pack(sizes, width, height):
+    """places rects of the given sizes onto as few width by height sheets as it can, in shelves of similar height;
+    returns (sheet, x, y) for each size"""
+
+    places = [None] * len(sizes)
+    sheet = 0
+    x = y = shelf = 0
+    for index in sorted(range(len(sizes)), key=lambda index: (-sizes[index][1], -sizes[index][0])):
+        w, h = sizes[index]
+        if x + w > width:
+            x = 0
+            y += shelf
+            shelf = 0
+        if y + h > height:
+            sheet += 1
+            x = y = shelf = 0
+        places[index] = (sheet, x, y)
+        x += w
+        shelf = max(shelf, h)
+    return places
+
+
+def build(roots, output, size, limit):
+    """packs the images under roots into sprite sheets in output, with an index of where each one went"""
+
+    found = images(roots, limit)
+    places = pack([image.get_size() for path, image in found], size, size)
+
+    # each sheet is only as tall as what was packed onto it
+    heights = {}
+    for (path, image), (sheet, x, y) in zip(found, places):
+        heights[sheet] = max(heights.get(sheet, 0), y + image.get_height())
+    sheets = [pygame.Surface([size, heights[sheet]], pygame.SRCALPHA) for sheet in sorted(heights)]
+    index = {}
+    for (path, image), (sheet, x, y) in zip(found, places):
+        # adding onto the clear sheet copies the pixels exactly, where blending would change the transparent ones
+        sheets[sheet].blit(image, (x, y), special_flags=pygame.BLEND_RGBA_ADD)
+        index[path] = [output + "/" + str(sheet) + ".png", [x, y] + list(image.get_size())]
+
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    for number in range(len(sheets)):
+        pygame.image.save(sheets[number], os.path.join(output, str(number) + ".png"))
+    with open(os.path.join(output, "index.json"), "w") as file:
+        json.dump(index, file, indent=0, sort_keys=True)
+    return len(found), len(sheets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="packs the small images in the assets into sprite sheets")
+    parser.add_argument("directories", nargs="*", default=directories)
+    parser.add_argument("--output", default=os.path.dirname(textures.atlas_index))
+    parser.add_argument("--size", type=int, default=1024, help="width and height of each sheet")
+    parser.add_argument("--largest", type=int, default=largest, help="images bigger than this are left out")
+    arguments = parser.parse_args()
+
+    count, sheets = build(arguments.directories, arguments.output, arguments.size, arguments.largest)
+    print("packed %d images into %d sheets" % (count, sheets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import argparse
+from src import terrain
+
+
+def main():
+    parser = argparse.ArgumentParser(description="converts maps saved in the old text format into binary maps")
+    parser.add_argument("maps", nargs="+", help="maps to convert, without the .txt extension")
+    parser.add_argument("--size", type=int, nargs=2, required=True, metavar=("LENGTH", "HEIGHT"),
+                        help="size of the maps in blocks, which the text format doesn't record")
+    parser.add_argument("--compress", action="store_true", help="deflate the tiles")
+    arguments = parser.parse_args()
+
+    length, height = arguments.size
+    for filename in arguments.maps:
+        terrain.convert(filename, length, height, arguments.compress)
+        print("wrote " + filename + ".map")
+
+
+if __name__ == "__main__":
+    main()
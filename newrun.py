@@ -1,11 +1,30 @@
 import pygame
-from src import terrain, display, entity, part, pobject, animation
+from src import terrain, display, entity, part, pobject, textures, sounds, collision, profiler, render, camera, replay
 import random
+import time
+import argparse
 
 # global reference, static variables
 volume = {"click": .5}
+sky = (200, 255, 255)
+
+# whether matches redraw only the changed parts of the screen instead of every frame in full
+dirty_rects = False
+
+# size of the world in blocks, or None to fit it to the screen; larger worlds scroll to follow the players
+arena = None
+
+# where matches played in the window write their replays when they end, or None to not record them
+record_path = None
+
+# keys that only change how a match is shown, which are left out of replays and still work while watching one
+viewing_keys = (pygame.K_F3, pygame.K_F5, pygame.K_F6)
+
+# simulation ticks per second of game time, the most frames drawn per second, and the most ticks run to catch up in one frame
+tick_rate = 60
+frame_limit = 120
+max_steps = 5
 pygame.init()
-system_info = pygame.display.Info()
 
 
 def play_sound(sound, multiplier):
@@ -14,10 +33,7 @@ def play_sound(sound, multiplier):
     else:
         value = 1.0
     value *= multiplier
-    effect = pygame.mixer.Sound("assets/sounds/" + sound + str(random.randint(0, 3)) + ".wav")
-    effect.set_volume(value)
-    if value > 0:
-        effect.play()
+    sounds.play(sound, value)
 
 
 class GUI:
@@ -25,9 +41,19 @@ class GUI:
 
     def __init__(self):
 
+        system_info = pygame.display.Info()
         window = pygame.display.set_mode((system_info.current_w//2, system_info.current_h//2), pygame.RESIZABLE | pygame.DOUBLEBUF)
+
+        # everything is drawn at one resolution and scaled to whatever size the window is
+        scaler = render.Scaler(window)
+        screen_surface = scaler.surface
         background = Background()
 
+        # every sound effect is decoded up front so playing one never touches the disk,
+        # and the textures are decoded in the background while the menus are up
+        sounds.bank.preload()
+        preloader = textures.preload()
+
         visuals = pygame.sprite.Group()
 
         music_volume = 1
@@ -127,44 +153,83 @@ class GUI:
                             pygame.mixer.music.fadeout(1200)
                             pygame.mixer.music.load("assets/sounds/level.mp3")
                             pygame.mixer.music.play(-1)
+                            if arena is not None:
+                                length, height = arena
+                            else:
+                                length, height = render.resolution[0]//16, render.resolution[1]//16 - 16
                             while True:
-                                game = Game(window, sfx_volume, visuals)
+                                game = Game(scaler, sfx_volume, visuals, length, height, record=record_path is not None)
+                                game.run()
+                                if game.recording is not None:
+                                    game.recording.save(record_path)
                             background.goto("title1")
                             pygame.mixer.music.load("assets/sounds/title.mp3")
                             pygame.mixer.music.play(-1)
 
-            window.blit(background.image, background.rect)
-            visuals.draw(window)
+            screen_surface.blit(background.image, background.rect)
+            visuals.draw(screen_surface)
+
+            # loading bar along the bottom of the screen
+            if not preloader.finished():
+                progress = preloader.step()
+                pygame.draw.rect(screen_surface, (255, 255, 255), (0, screen_surface.get_height() - 4, int(screen_surface.get_width() * progress), 4))
+            scaler.present()
             pygame.display.update()
 
 
 class Game:
     """runs the actual game aspect"""
 
-    def __init__(self, window, volume, visuals):
+    def __init__(self, scaler, volume, visuals, length, height, seed=None, record=False, playback=None):
+        """a scaler of None runs the game headless: nothing is drawn or heard and ticks are not throttled
+
+        record keeps a replay of the match in self.recording; playback is a replay whose key events the players
+        are given instead of the keyboard's"""
+
+        # frames are drawn to the scaler's surface, then scaled to fit the window
+        self.scaler = scaler
+        self.headless = scaler is None
+        self.window = None
+        if not self.headless:
+            self.window = scaler.surface
+        self.visuals = visuals
+        self.volume = volume
+
+        # the seed decides the terrain, crate drops and everything else random in the match, so a recorded match needs one
+        if seed is None and record:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        if seed is not None:
+            random.seed(seed)
+
+        self.recording = None
+        if record:
+            self.recording = replay.Replay(seed, length, height)
+        self.playback = playback
 
         # entity objects
-        particles = pygame.sprite.Group()
-        real_entities = pygame.sprite.Group()
-
-        # blocks
-        blocks = pygame.sprite.Group()
+        self.particles = entity.ParticleSystem()
+        self.real_entities = pygame.sprite.Group()
 
         # generating the world
-        world = terrain.World(system_info.current_w//32, system_info.current_h//32 - 16, blocks)
-        world.generate(30)
-        world.initialize()
-        entity.terrain = world
-        pobject.terrain = world
+        self.world = terrain.World(length, height)
+        self.world.generate(30)
+        self.world.initialize()
+        entity.terrain = self.world
+        pobject.terrain = self.world
+
+        # broad phase for collisions between entities
+        self.space = collision.SpatialHash()
+        entity.space = self.space
 
         # player 1 and 2 are spawned
-        player1 = entity.Player(200, 0, 100, [particles, visuals, real_entities], 0, 0, "example_player", world, volume)
-        player2 = entity.Player(1200, 0, 100, [particles, visuals, real_entities], 600, 0, "sisters_character", world, volume)
+        self.player1 = entity.Player(200, self.drop_height(200), 100, [self.particles, visuals, self.real_entities], 0, 0, "example_player", self.world, volume)
+        self.player2 = entity.Player(1200, self.drop_height(1200), 100, [self.particles, visuals, self.real_entities], 600, 0, "sisters_character", self.world, volume)
 
         # player 2 has a different keybinding set
-        player2.binding = {"left": "LEFT", "right": "RIGHT", "up": "UP", "sprint": "RCTRL", "use": "KP5", "adjust_greater": "KP6", "adjust_lower": "KP4", "escape": "KP7"}
+        self.player2.binding = {"left": "LEFT", "right": "RIGHT", "up": "UP", "sprint": "RCTRL", "use": "KP5", "adjust_greater": "KP6", "adjust_lower": "KP4", "escape": "KP7"}
 
-        real_entities.add(player1, player2)
+        self.real_entities.add(self.player1, self.player2)
         #block = part.Torso()
         #real_entities.add(block)
         #test = pobject.pobject()
@@ -172,127 +237,344 @@ class Game:
         #test.x_velocity = 6
 
         # initial crate
-        real_entities.add(entity.Crate(600, 0, visuals, volume))
+        self.real_entities.add(entity.Crate(600, self.drop_height(600), visuals, volume))
 
         # message for when game ends
         texture = pygame.Surface([0, 0])
-        end_message = display.Visual("end_message", 522, 300, 396, 174, texture, visuals)
-
-        clock = pygame.time.Clock()
+        self.end_message = display.Visual("end_message", 522, 300, 396, 174, texture, visuals)
 
         # used to track the ending sequence
-        end_counter = -1
+        self.end_counter = -1
 
         # time between crate spawns
-        drop = 1000
-        done = False
-        player2.add_items("dynamite", 99)
-        player2.add_items("fireworks", 99)
-        player1.add_items("log", 99)
-        player2.add_items("log", 99)
-        x_coord = animation.DopeSheet()
-        x_coord.interpolate()
-        time = 0
-
-        while not done:
-            clock.tick(60)
-
-            # ending sequence
-            if end_counter != -1:
-                if end_counter == 2000:
-                    if player1.alive:
-                        message = "player_1.png"
-                    else:
-                        message = "player_2.png"
-                    end_message.set_image("assets/displays/end_messages/" + message)
-                    for x in range(100, 1400, 200):
-                        real_entities.add(entity.Fireworks(x, 100, True, particles, real_entities, player1))
-                elif end_counter == 1500:
-                    end_message.set_image("assets/displays/end_messages/trophy.png")
-                elif not (player1.alive or player2.alive):
-                    if end_counter == 800:
-                        end_message.set_image("assets/displays/end_messages/oh.png")
-                    elif end_counter == 600:
-                        pygame.mixer.music.load("assets/sounds/final.mp3")
-                        pygame.mixer.music.play(1)
-                        end_message.set_image("assets/displays/end_messages/tie.png")
-                elif end_counter == 800:
-                    end_message.hide()
-                    for each in real_entities:
-                        each.kill()
-                    return
-                if end_counter == 0:
-                    end_message.hide()
-                    for each in real_entities:
-                        each.kill()
-                    return
-                end_counter -= 1
-
-            drop -= 1
-
-            # randomized drop times and locations
-            if drop == 0 and end_counter < 0:
-                drop = random.randint(240, 1000)
-                real_entities.add(entity.Crate(random.randint(0, 1000), 0, visuals, volume))
-
-            # initiate end sequence if a player dies
-            if (player1.health <= 0 or player2.health <= 0) and end_counter == -1:
-                end_counter = 2000
-                pygame.mixer.music.fadeout(1200)
-                pygame.mixer.music.load("assets/sounds/win.mp3")
-                pygame.mixer.music.play()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    end_message.kill()
-                    for each in real_entities:
-                        each.kill()
-                    return
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
-                    end_message.kill()
-                    for each in real_entities:
-                        each.kill()
-                    return
-
-                # players are given the events if they are alive
+        self.drop = 1000
+        self.player2.add_items("dynamite", 99)
+        self.player2.add_items("fireworks", 99)
+        self.player1.add_items("log", 99)
+        self.player2.add_items("log", 99)
+        self.time = 0
+
+        # per-phase frame timing, shown over the game with F3
+        self.timer = profiler.FrameTimer()
+        self.show_timings = False
+
+        # game time passes time_scale times as fast as real time; F5 and F6 slow it down and speed it up
+        self.time_scale = 1.0
+        self.previous = {}
+
+        # follows the players around worlds too big for the screen
+        self.camera = None
+        if not self.headless:
+            self.camera = camera.Camera(*self.window.get_size())
+        entity.camera = self.camera
+
+        # None draws every frame in full
+        self.renderer = None
+        if dirty_rects and not self.headless:
+            self.renderer = render.DirtyRenderer(sky)
+
+    def music(self, filename, loops=0):
+        if not self.headless:
+            pygame.mixer.music.load("assets/sounds/" + filename)
+            pygame.mixer.music.play(loops)
+
+    def end(self):
+        """removes everything belonging to the match"""
+        for each in self.real_entities:
+            each.kill()
+        self.world.close()
+
+    def step(self, events):
+        """advances the match by one tick, returning False once it is over"""
+
+        player1 = self.player1
+        player2 = self.player2
+
+        # replays are filed before anything can end the match, so they count the tick it ends on
+        if self.playback is not None:
+            keys = (pygame.KEYDOWN, pygame.KEYUP)
+            events = [event for event in events if event.type not in keys or event.key in viewing_keys]
+            events += self.playback.events(self.time)
+        if self.recording is not None:
+            self.recording.record(self.time, [event for event in events if getattr(event, "key", None) not in viewing_keys])
+
+        # ending sequence
+        if self.end_counter != -1:
+            if self.end_counter == 2000:
                 if player1.alive:
-                    player1.action(event)
-                if player2.alive:
-                    player2.action(event)
-
-            # collisions between blocks and entities passed to entities
-            for hitbox in real_entities:
-                try:
-                    collisions = pygame.sprite.groupcollide(real_entities, real_entities, False, False)[hitbox]
-                except KeyError:
-                    collisions = []
-                hitbox.entities = collisions
-
-            # sky color
-
-            time += 1
-            #player2.real_x = x_coord.at(time)
-            #player2.real_y = 400
-
-            window.fill((200, 255, 255))
+                    message = "player_1.png"
+                else:
+                    message = "player_2.png"
+                self.end_message.set_image("assets/displays/end_messages/" + message)
+                for x in range(100, 1400, 200):
+                    self.real_entities.add(entity.Fireworks(x, 100, True, self.particles, self.real_entities, player1))
+            elif self.end_counter == 1500:
+                self.end_message.set_image("assets/displays/end_messages/trophy.png")
+            elif not (player1.alive or player2.alive):
+                if self.end_counter == 800:
+                    self.end_message.set_image("assets/displays/end_messages/oh.png")
+                elif self.end_counter == 600:
+                    self.music("final.mp3", 1)
+                    self.end_message.set_image("assets/displays/end_messages/tie.png")
+            elif self.end_counter == 800:
+                self.end_message.hide()
+                self.end()
+                return False
+            if self.end_counter == 0:
+                self.end_message.hide()
+                self.end()
+                return False
+            self.end_counter -= 1
+
+        self.drop -= 1
+
+        # randomized drop times and locations
+        if self.drop == 0 and self.end_counter < 0:
+            self.drop = random.randint(240, 1000)
+            x = random.randint(0, 1000)
+            self.real_entities.add(entity.Crate(x, self.drop_height(x), self.visuals, self.volume))
+
+        # initiate end sequence if a player dies
+        if (player1.health <= 0 or player2.health <= 0) and self.end_counter == -1:
+            self.end_counter = 2000
+            if not self.headless:
+                pygame.mixer.music.fadeout(1200)
+            self.music("win.mp3")
+        self.timer.mark("rules")
+
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_p):
+                self.end_message.kill()
+                self.end()
+                return False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_timings = not self.show_timings
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                self.time_scale = max(self.time_scale / 2, .125)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F6:
+                self.time_scale = min(self.time_scale * 2, 8.0)
+            elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED) and not self.headless:
+                # the screen stays the same size, but the window has to be drawn over in full
+                self.scaler.invalidate()
+                if self.renderer is not None:
+                    self.renderer.invalidate()
+
+            # players are given the events if they are alive
+            if player1.alive:
+                player1.action(event)
+            if player2.alive:
+                player2.action(event)
+        self.timer.mark("events")
+
+        # the terrain of big worlds is generated as things get close to it, before they can touch it
+        self.stream()
+        self.timer.mark("stream")
+
+        # collisions between blocks and entities passed to entities
+        self.space.collide(self.real_entities)
+        self.timer.mark("collision")
+
+        self.time += 1
+
+        self.visuals.update()
+        self.timer.mark("update_visuals")
+        self.particles.update()
+        self.timer.mark("update_particles")
+        self.real_entities.update()
+        self.timer.mark("update_entities")
+        return True
+
+    def render(self, surface):
+
+        offset = self.offset()
+        scrolled = self.scroll(offset)
+
+        # sky color
+        surface.fill(sky)
+        self.timer.mark("draw_sky")
+
+        self.particles.draw(surface, offset=offset)
+        self.timer.mark("draw_particles")
+        self.real_entities.draw(surface)
+        self.timer.mark("draw_entities")
+        self.world.draw(surface, offset=offset)
+        self.timer.mark("draw_world")
+        self.visuals.draw(surface)
+        self.timer.mark("draw_visuals")
+
+        if self.show_timings:
+            surface.blit(self.timer.overlay(), (surface.get_width() - 290, 10))
+
+        for sprite, position in scrolled:
+            sprite.rect.topleft = position
+
+    def draw(self, blend=1.0):
+        """draws the frame blend of the way from the previous tick to the latest one"""
+
+        restore = self.interpolate(blend)
+
+        # the camera follows where the players are drawn, and only the terrain around it is kept rendered
+        self.camera.follow([player for player in (self.player1, self.player2) if player.alive],
+                           (self.world.length * 16, self.world.height * 16))
+        self.world.chunks.keep(self.camera.view())
+
+        if self.renderer is None:
+            self.render(self.window)
+            areas = None
+        else:
+            offset = self.offset()
+            scrolled = self.scroll(offset)
+            overlays = []
+            if self.show_timings:
+                overlays.append((self.timer.overlay(), (self.window.get_width() - 290, 10)))
+            areas = self.renderer.draw(self.window, [self.particles, self.real_entities, self.world, self.visuals], overlays, offset)
+            for sprite, position in scrolled:
+                sprite.rect.topleft = position
+            self.timer.mark("draw")
+        for sprite, position in restore:
+            sprite.rect.topleft = position
+
+        areas = self.scaler.present(areas)
+        self.timer.mark("scale")
+
+        if areas is None:
+            pygame.display.update()
+        elif areas:
+            pygame.display.update(areas)
+        self.timer.mark("display")
 
-            visuals.update()
-            particles.update()
-            real_entities.update()
+    def run(self, ticks=None):
+        """plays the match until it ends or ticks ticks have passed, returning how many ticks ran per second
 
-            particles.draw(window)
-            real_entities.draw(window)
-            blocks.draw(window)
-            visuals.draw(window)
+        the simulation advances in fixed ticks of 1 / tick_rate seconds of game time, however long frames take to draw;
+        headless games run those ticks back to back as fast as they can"""
 
-            pygame.display.update()
+        clock = pygame.time.Clock()
+        start = time.perf_counter()
+        count = 0
+
+        if self.headless:
+            while ticks is None or count < ticks:
+                self.timer.begin()
+                running = self.step([])
+                count += 1
+                if not running:
+                    break
+                self.timer.end(self.counts())
+            return self.rate(count, start)
+
+        tick_length = 1 / tick_rate
+        accumulator = 0.0
+        pending = []
+        running = True
+
+        while running and (ticks is None or count < ticks):
+            elapsed = clock.tick(frame_limit) / 1000
+            accumulator += min(elapsed, max_steps * tick_length) * self.time_scale
+
+            self.timer.begin()
+            pending.extend(pygame.event.get())
+            self.timer.mark("events")
+
+            # catch up on the game time that has passed, giving up on anything beyond max_steps ticks
+            steps = 0
+            while accumulator >= tick_length and steps < max_steps and (ticks is None or count < ticks):
+                self.remember_positions()
+                running = self.step(pending)
+                pending = []
+                accumulator -= tick_length
+                steps += 1
+                count += 1
+                if not running:
+                    break
+            if steps == max_steps:
+                accumulator = min(accumulator, tick_length)
+
+            # nothing can be drawn until the first tick has given every sprite an image
+            if running and count > 0:
+                self.draw(min(accumulator / tick_length, 1.0))
+                self.timer.end(self.counts())
+
+        return self.rate(count, start)
+
+    def stream(self):
+        """generates the terrain a chunk around every entity, and a screen around the players and the point between
+        them the camera heads for; this only depends on where things are, so headless games generate the same terrain.
+        the terrain a screen further out is started early on big worlds, so it is ready when they get there"""
+
+        if not self.world.pending:
+            return
+        margin = terrain.chunk_size
+        for each in self.real_entities:
+            self.world.stream(each.rect.left // 16 - margin, each.rect.right // 16 + margin)
+
+        players = [player for player in (self.player1, self.player2) if player.alive]
+        if players:
+            reach = render.resolution[0] // 32 + margin
+            middle = sum(player.rect.centerx for player in players) // len(players)
+            for x in [player.rect.centerx for player in players] + [middle]:
+                self.world.prefetch(x // 16 - 2 * reach, x // 16 + 2 * reach)
+            for x in [player.rect.centerx for player in players] + [middle]:
+                self.world.stream(x // 16 - reach, x // 16 + reach)
+
+    def counts(self):
+        return {"visuals": len(self.visuals), "particles": len(self.particles), "entities": len(self.real_entities)}
+
+    def rate(self, count, start):
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            return count / elapsed
+        return float("inf")
+
+    def drop_height(self, x):
+        """where things dropping into the match at x start: the top of the world, or at most 480 pixels above
+        the ground so nothing falls all the way down a tall world"""
+        column = min(max(x // 16, 0), self.world.length - 1)
+        return max(self.world.surface(column) * 16 - 480, 0)
+
+    def offset(self):
+        """how far the world is scrolled"""
+        if self.camera is None:
+            return 0, 0
+        return self.camera.offset()
+
+    def scroll(self, offset):
+        """moves the sprites that are part of the world to where they are on screen, returning where to put them back"""
+
+        restore = []
+        if offset == (0, 0):
+            return restore
+        for group in (self.real_entities, self.visuals):
+            for sprite in group:
+                if sprite.scrolls:
+                    restore.append((sprite, sprite.rect.topleft))
+                    sprite.rect.move_ip(-offset[0], -offset[1])
+        return restore
+
+    def remember_positions(self):
+        """notes where every moving sprite is before a tick so frames can be drawn between ticks"""
+        self.previous = {}
+        for group in (self.real_entities, self.visuals):
+            for sprite in group:
+                self.previous[sprite] = sprite.rect.topleft
+
+    def interpolate(self, blend):
+        """moves sprites blend of the way back from their last positions, returning where to put them back"""
+
+        restore = []
+        for sprite, (x, y) in self.previous.items():
+            if sprite.groups():
+                current = sprite.rect.topleft
+                restore.append((sprite, current))
+                sprite.rect.topleft = (round(x + (current[0] - x) * blend), round(y + (current[1] - y) * blend))
+        return restore
 
 
 class Background:
     """runs the background"""
 
     def __init__(self):
-        self.image = pygame.image.load("assets/displays/menus/title1.png")
+        self.image = textures.load("assets/displays/menus/title1.png")
         self.rect = self.image.get_rect()
         self.rect.left, self.rect.top = [0, 0]
         self.screen = "title1"
@@ -300,12 +582,67 @@ class Background:
 
     def goto(self, name):
         play_sound("click", self.volume)
-        self.image = pygame.image.load("assets/displays/menus/" + name + ".png")
+        self.image = textures.load("assets/displays/menus/" + name + ".png")
         self.screen = name
 
 
+def simulate(seed, length, height, ticks, record=None):
+    """runs a match headless, without a display or audio, returning how many ticks ran per second;
+    record is where to write its replay, if anywhere"""
+
+    sounds.bank.muted = True
+    game = Game(None, 0, pygame.sprite.Group(), length, height, seed, record is not None)
+    rate = game.run(ticks)
+    if record is not None:
+        game.recording.save(record)
+    return rate
+
+
+def play(path, headless):
+    """plays a recorded match back, as fast as it will go when headless, returning how many ticks ran per second"""
+
+    recorded = replay.load(path)
+    scaler = None
+    if headless:
+        sounds.bank.muted = True
+    else:
+        system_info = pygame.display.Info()
+        window = pygame.display.set_mode((system_info.current_w//2, system_info.current_h//2), pygame.RESIZABLE | pygame.DOUBLEBUF)
+        scaler = render.Scaler(window)
+        sounds.bank.preload()
+    game = Game(scaler, 1, pygame.sprite.Group(), recorded.length, recorded.height, recorded.seed, playback=recorded)
+    return game.run(recorded.ticks)
+
+
 def main():
-    main_window = GUI()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true", help="simulate a match without a window")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--size", type=int, nargs=2, metavar=("LENGTH", "HEIGHT"),
+                        help="world size in blocks, 90 by 30 headless and fitted to the screen otherwise")
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--dirty-rects", action="store_true", help="only redraw the parts of the screen that change")
+    parser.add_argument("--scaling", choices=["integer", "fit", "smooth"], default=render.scaling,
+                        help="how the screen is scaled to the window: by whole numbers only, to fill it, or smoothly")
+    parser.add_argument("--record", metavar="PATH", help="write a replay of each match to PATH when it ends")
+    parser.add_argument("--replay", metavar="PATH", help="play back a recorded match, as fast as possible with --headless")
+    parser.add_argument("--profile", metavar="PATH", help="periodically write frame timings to PATH.json and PATH.csv")
+    arguments = parser.parse_args()
+    profiler.dump_path = arguments.profile
+    global dirty_rects, arena, record_path
+    dirty_rects = arguments.dirty_rects
+    arena = arguments.size
+    record_path = arguments.record
+    render.scaling = arguments.scaling
+
+    if arguments.replay:
+        print("%.1f ticks per second" % play(arguments.replay, arguments.headless))
+    elif arguments.headless:
+        length, height = arguments.size or (90, 30)
+        print("%.1f ticks per second" % simulate(arguments.seed, length, height, arguments.ticks, arguments.record))
+    else:
+        main_window = GUI()
 
 
-main()
+if __name__ == "__main__":
+    main()
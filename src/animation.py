@@ -1,3 +1,10 @@
+import pygame
+from src import textures
+
+# clips that have already been built, by their arguments
+clips = {}
+
+
 class DopeSheet:
 
     def __init__(self):
@@ -85,3 +92,40 @@ class DopeSheet:
             self.interpolations.append([ease_upper_bound + keyframe[0], next_keyframe[2], y + keyframe[1] + intercept])
 
         print(self.interpolations)
+
+
+class Clip:
+    """every frame of an animation, loaded, colorkeyed and flipped once so that playing it allocates nothing
+
+    only clips made with flip have frames facing left, since most animations never turn around"""
+
+    def __init__(self, directory, length, frames_per_mode, ticks_per_frame, alpha=False, colorkey=None, flip=False):
+
+        self.frames_per_mode = frames_per_mode
+        self.ticks_per_frame = ticks_per_frame
+
+        # frames facing right are the textures as drawn, frames facing left are mirrored copies
+        self.right = [textures.load(directory + "/" + str(index) + ".png", alpha, colorkey) for index in range(length)]
+        self.left = None
+        if flip:
+            self.left = [pygame.transform.flip(texture, True, False) for texture in self.right]
+
+    def frame(self, index, right=True):
+        if right:
+            return self.right[index]
+        return self.left[index]
+
+    def at(self, mode, tick, right=True):
+        """the frame of the given mode that is showing tick ticks into the animation"""
+        return self.frame(mode * self.frames_per_mode + (tick // self.ticks_per_frame) % self.frames_per_mode, right)
+
+
+def clip(directory, length, frames_per_mode=None, ticks_per_frame=1, alpha=False, colorkey=None, flip=False):
+    """returns the Clip for directory, building it the first time it is asked for"""
+
+    if frames_per_mode is None:
+        frames_per_mode = length
+    key = (directory, length, frames_per_mode, ticks_per_frame, alpha, colorkey, flip)
+    if key not in clips:
+        clips[key] = Clip(directory, length, frames_per_mode, ticks_per_frame, alpha, colorkey, flip)
+    return clips[key]
@@ -0,0 +1,58 @@
+import pygame
+
+# how much of the way to its target the camera moves every frame, 1 to keep it locked on
+smoothing = .15
+
+
+class Camera:
+    """the part of the world shown on screen, kept centered on the players but never past the edges of the world"""
+
+    def __init__(self, width, height):
+
+        self.width = width
+        self.height = height
+
+        # top left corner of the view in world pixels; None until the camera has something to follow
+        self.x = None
+        self.y = None
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def follow(self, targets, bounds):
+        """moves toward the middle of the targets' rects, keeping the view inside bounds (the world's size in pixels)"""
+
+        if not targets:
+            return
+        target_x = sum(target.rect.centerx for target in targets) / len(targets) - self.width / 2
+        target_y = sum(target.rect.centery for target in targets) / len(targets) - self.height / 2
+        target_x = min(max(target_x, 0), max(bounds[0] - self.width, 0))
+        target_y = min(max(target_y, 0), max(bounds[1] - self.height, 0))
+
+        if self.x is None:
+            self.x = target_x
+            self.y = target_y
+        else:
+            self.x += (target_x - self.x) * smoothing
+            self.y += (target_y - self.y) * smoothing
+
+    def offset(self):
+        """how far the world is scrolled, in whole pixels"""
+        if self.x is None:
+            return 0, 0
+        return int(round(self.x)), int(round(self.y))
+
+    def view(self):
+        """the rect of the world on screen, in world pixels"""
+        x, y = self.offset()
+        return pygame.Rect(x, y, self.width, self.height)
+
+    def to_world(self, position):
+        """converts a position on screen, like the mouse's, to world pixels"""
+        x, y = self.offset()
+        return position[0] + x, position[1] + y
+
+    def to_screen(self, position):
+        x, y = self.offset()
+        return position[0] - x, position[1] - y
@@ -0,0 +1,141 @@
+import pygame
+import numpy
+import math
+
+# width and height of a spatial hash cell in pixels, and of a terrain tile
+cell_size = 64
+tile_size = 16
+
+
+class SpatialHash:
+    """uniform grid that sprites are sorted into once per tick so overlap queries only look at nearby sprites"""
+
+    def __init__(self, size=cell_size):
+
+        self.size = size
+        self.cells = {}
+        self.order = {}
+
+    def cells_of(self, rect):
+        """every cell coordinate the rect touches"""
+
+        left = rect.left // self.size
+        right = max(rect.left, rect.right - 1) // self.size
+        top = rect.top // self.size
+        bottom = max(rect.top, rect.bottom - 1) // self.size
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                yield x, y
+
+    def rebuild(self, sprites):
+        """sorts every sprite into the cells under its rect"""
+
+        self.cells = {}
+        self.order = {}
+        for index, sprite in enumerate(sprites):
+            self.order[sprite] = index
+            for cell in self.cells_of(sprite.rect):
+                if cell in self.cells:
+                    self.cells[cell].append(sprite)
+                else:
+                    self.cells[cell] = [sprite]
+
+    def candidates(self, rect):
+        found = set()
+        for cell in self.cells_of(rect):
+            if cell in self.cells:
+                found.update(self.cells[cell])
+        return found
+
+    def query_rect(self, rect):
+        """sprites whose rects overlap rect, in the order they were added"""
+
+        hits = [sprite for sprite in self.candidates(rect) if rect.colliderect(sprite.rect)]
+        hits.sort(key=self.order.__getitem__)
+        return hits
+
+    def query_radius(self, x, y, radius):
+        """sprites whose rects come within radius of the point x, y, in the order they were added"""
+
+        bounds = pygame.Rect(x - radius, y - radius, 2 * radius + 1, 2 * radius + 1)
+        hits = []
+        for sprite in self.candidates(bounds):
+            rect = sprite.rect
+            dx = max(rect.left - x, 0, x - rect.right + 1)
+            dy = max(rect.top - y, 0, y - rect.bottom + 1)
+            if dx * dx + dy * dy <= radius * radius:
+                hits.append(sprite)
+        hits.sort(key=self.order.__getitem__)
+        return hits
+
+    def collide(self, sprites):
+        """rebuilds the grid from sprites and gives each one the list of sprites it overlaps"""
+
+        self.rebuild(sprites)
+        for sprite in self.order:
+            sprite.entities = self.query_rect(sprite.rect)
+
+
+def first_solid(grid, rows, columns, axis, step):
+    """the index along axis of the first line of tiles in grid[rows, columns] that has anything solid in it,
+    searching in the direction of step, or None if they are all empty"""
+
+    solid = numpy.flatnonzero(grid[rows, columns].any(axis=1 - axis))
+    if len(solid) == 0:
+        return None
+    return int(solid[0]) if step > 0 else int(solid[-1])
+
+
+def clamp(start, distance, pixels):
+    """the distance to move from start so that it ends pixels whole pixels along, keeping the fraction it started with;
+    moves that already end on that pixel are left alone"""
+
+    if math.floor(start + distance) - math.floor(start) == pixels:
+        return distance
+    return pixels
+
+
+def sweep(grid, left, top, width, height, dx, dy, tile=tile_size):
+    """moves a width by height box with its top left corner at left, top through a grid of tiles by dx, dy,
+    x first and then y, stopping each axis at the first pixel that overlaps a solid tile
+
+    every line of tiles the leading edge crosses is checked in one pass, however far the box moves, so nothing fast
+    can skip through a wall between ticks; tiles outside the grid count as empty
+    returns the distance moved along each axis and the normal of the surface hit along each, or 0 if nothing was"""
+
+    rows_total, columns_total = grid.shape
+    moved_x = dx
+    normal_x = 0
+    if dx != 0:
+        # the columns the leading edge moves into, and the rows the box covers while it does
+        edge = math.floor(left) + (width - 1 if dx > 0 else 0)
+        start = edge // tile + (1 if dx > 0 else -1)
+        end = (math.floor(left + dx) + (width - 1 if dx > 0 else 0)) // tile
+        rows = slice(max(math.floor(top) // tile, 0), min((math.floor(top) + height - 1) // tile + 1, rows_total))
+        low = max(min(start, end), 0)
+        high = min(max(start, end) + 1, columns_total)
+        if (end - start) * (1 if dx > 0 else -1) >= 0 and low < high and rows.start < rows.stop:
+            hit = first_solid(grid, rows, slice(low, high), 1, dx)
+            if hit is not None:
+                column = low + hit
+                normal_x = -1 if dx > 0 else 1
+                moved_x = clamp(left, dx, column * tile + (0 if dx > 0 else tile - 1) - edge)
+
+    left += moved_x
+    moved_y = dy
+    normal_y = 0
+    if dy != 0:
+        edge = math.floor(top) + (height - 1 if dy > 0 else 0)
+        start = edge // tile + (1 if dy > 0 else -1)
+        end = (math.floor(top + dy) + (height - 1 if dy > 0 else 0)) // tile
+        columns = slice(max(math.floor(left) // tile, 0), min((math.floor(left) + width - 1) // tile + 1, columns_total))
+        low = max(min(start, end), 0)
+        high = min(max(start, end) + 1, rows_total)
+        if (end - start) * (1 if dy > 0 else -1) >= 0 and low < high and columns.start < columns.stop:
+            hit = first_solid(grid, slice(low, high), columns, 0, dy)
+            if hit is not None:
+                row = low + hit
+                normal_y = -1 if dy > 0 else 1
+                moved_y = clamp(top, dy, row * tile + (0 if dy > 0 else tile - 1) - edge)
+
+    return moved_x, moved_y, normal_x, normal_y
@@ -1,8 +1,27 @@
 import pygame
+from src import textures
+
+# blank image shared by every hidden Visual
+hidden = pygame.Surface([64, 32])
+hidden.fill((0, 0, 0))
+hidden.set_colorkey((0, 0, 0))
+
+# the images of the digits 0 to 9 that numbers are drawn with, loaded the first time they are needed
+digits = []
+
+
+def digit(value):
+    if not digits:
+        digits.extend(textures.load("assets/numbers/" + str(each) + ".png", True, (0, 0, 0)) for each in range(10))
+    return digits[value]
 
 
 class Visual(pygame.sprite.Sprite):
-    """when using this class to make menus and screens, you should pass the image as "pygame.image.load("myimage.png").convert()" """
+    """when using this class to make menus and screens, you should pass the image as "textures.load("myimage.png", colorkey=(0, 0, 0))",
+    since the image is used as it is rather than copied and keyed here"""
+
+    # visuals stay put on the screen unless they are set to move with the world, like ones following an entity
+    scrolls = False
 
     def __init__(self, name, x, y, width, height, texture, draw_group):
         pygame.sprite.Sprite.__init__(self)
@@ -13,10 +32,6 @@ class Visual(pygame.sprite.Sprite):
         self.draw_group.add(self)
         self.rect = pygame.Rect(x, y, width, height, center=(x, y))
         self.image = texture
-        try:
-            self.image.set_colorkey((0, 0, 0))
-        except AttributeError:
-            pass
         self.rect.x = x
         self.rect.y = y
         self.child = None
@@ -28,27 +43,30 @@ class Visual(pygame.sprite.Sprite):
 
     def parent(self, child):
         self.child = child
-        self.child_x = child.rect.x - self.rect.x
-        self.child_y = child.rect.y - self.rect.y
+        x, y = child.position()
+        self.child_x = x - self.rect.x
+        self.child_y = y - self.rect.y
+
+    def position(self):
+        return self.rect.x, self.rect.y
+
+    def place(self, x, y):
+        """moves the visual so that position() is x, y"""
+        self.rect.x = x
+        self.rect.y = y
 
     def set_image(self, directory):
-        self.image = pygame.image.load(directory).convert()
-        try:
-            self.image.set_colorkey((0, 0, 0))
-        except AttributeError:
-            pass
+        self.image = textures.load(directory, colorkey=(0, 0, 0))
 
     def rotate(self, value):
         x, y = self.image.get_rect().center
         x += self.rect.x
         y += self.rect.y
-        self.image = pygame.transform.rotate(self.image, value)
+        self.image = textures.rotate(self.image, value)
         self.rect = self.image.get_rect(center=(x, y))
 
     def hide(self):
-        self.image = pygame.Surface([64, 32])
-        self.image.fill((0, 0, 0))
-        self.image.set_colorkey((0, 0, 0))
+        self.image = hidden
 
     def kill(self):
         if self.child is not None:
@@ -58,8 +76,7 @@ class Visual(pygame.sprite.Sprite):
     def update(self):
         pygame.sprite.Sprite.update(self)
         if self.child is not None:
-            self.child.rect.x = self.rect.x + self.child_x
-            self.child.rect.y = self.rect.y + self.child_y
+            self.child.place(self.rect.x + self.child_x, self.rect.y + self.child_y)
 
 class Button(Visual):
 
@@ -91,9 +108,8 @@ class Menu(Visual):
         del self.components[component]
 
     def update(self):
-        for component in self.components:
+        for component, coordinates in zip(self.components, self.component_locations):
             component.update()
-            coordinates = self.component_locations[self.components.index(component)]
             component.rect.x = coordinates[0] + self.rect.x
             component.rect.y = coordinates[1] + self.rect.y
 
@@ -120,6 +136,7 @@ class Meter(Visual):
         bar = pygame.Surface([width - 8, height - 8]).fill(self.bar_color)
         self.bar = Visual("bar", x + 4, y + 4, width - 8, height - 8, bar, draw_group)
         draw_group.add(self.bar)
+        self.bar_width = None
         self.px_offset = 0
         self.py_offset = 21
 
@@ -128,56 +145,81 @@ class Meter(Visual):
         Visual.kill(self)
 
     def update(self):
-        self.bar.image = pygame.Surface([self.value / self.max * (self.width - 8), self.height])
-        self.bar.image.fill(self.bar_color)
+        # the bar is only redrawn when the value moves it
+        width = self.value / self.max * (self.width - 8)
+        if width != self.bar_width:
+            self.bar_width = width
+            self.bar.image = pygame.Surface([width, self.height])
+            self.bar.image.fill(self.bar_color)
         self.bar.update()
 
 
+class Hud(Visual):
+    """draws every sprite in its widgets group as one image, which is only put together again when one of them
+    changes image or moves, so a HUD that isn't changing costs a single blit"""
+
+    def __init__(self, name, draw_group):
+        Visual.__init__(self, name, 0, 0, 0, 0, hidden, draw_group)
+        self.widgets = pygame.sprite.Group()
+        self.signature = None
+
+    def update(self):
+        self.widgets.update()
+        signature = [(widget.image, widget.rect.topleft) for widget in self.widgets]
+        if signature != self.signature:
+            self.signature = signature
+            self.composite()
+
+    def composite(self):
+        widgets = self.widgets.sprites()
+        if not widgets:
+            self.image = hidden
+            return
+        areas = [pygame.Rect(widget.rect.topleft, widget.image.get_size()) for widget in widgets]
+        self.rect = areas[0].unionall(areas[1:])
+        self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        for widget, area in zip(widgets, areas):
+            self.image.blit(widget.image, area.move(-self.rect.x, -self.rect.y))
+
+    def kill(self):
+        for widget in self.widgets:
+            widget.kill()
+        Visual.kill(self)
+
+
 class Number(Visual):
+    """a whole number drawn into one image, which is only redrawn when the value changes
+
+    its position is that of the ones digit, any further digits reach out to the left; nothing is shown for 0"""
 
     def __init__(self, name, x, y, draw_group):
 
         Visual.__init__(self, name, x, y, 20, 24, pygame.Surface([0, 0]), draw_group)
         self.value = 0
-        self.previous_digit = None
-        self.next_digit = None
+        self.shown = None
+        self.offset = 0
 
         self.add(0)
 
-    def kill(self):
-        if self.next_digit is not None:
-            self.next_digit.kill()
-        Visual.kill(self)
+    def position(self):
+        return self.rect.x + self.offset, self.rect.y
 
-    def add(self, value):
-        if self.value + value > 9:
-            self.value += value
-            if self.next_digit is None:
-                self.next_digit = Number("digit", 0, 0, self.draw_group)
-                self.next_digit.value = self.value // 10
-                self.next_digit.previous_digit = self
-                self.next_digit.add(0)
-                self.draw_group.add(self.next_digit)
-            else:
-                self.next_digit.add(self.value // 10)
-            self.value = self.value % 10
-        elif self.value + value >= 0:
-            self.value += value
-        elif self.value + value < 0:
-            if self.previous_digit is None:
-                self.value += value
-                while self.value < 0:
-                    self.next_digit.add(-1)
-                    self.value += 10
-        self.image = pygame.image.load("assets/numbers/" + str(self.value) + ".png")
-        self.image.set_colorkey((0, 0, 0))
+    def place(self, x, y):
+        self.rect.x = x - self.offset
+        self.rect.y = y
 
-    def update(self):
-        Visual.update(self)
-        if self.next_digit is not None:
-            self.next_digit.rect.x = self.rect.x - 20
-            self.next_digit.rect.y = self.rect.y
-        if self.next_digit is None and self.value == 0:
-            self.kill()
+    def add(self, value):
+        self.value = max(self.value + value, 0)
+        if self.value == self.shown:
+            return
+        self.shown = self.value
+
+        x, y = self.position()
+        text = str(self.value) if self.value > 0 else ""
+        self.image = pygame.Surface([20 * len(text), 24], pygame.SRCALPHA)
+        for index in range(len(text)):
+            self.image.blit(digit(int(text[index])), (20 * index, 0))
+        self.offset = 20 * max(len(text) - 1, 0)
+        self.place(x, y)
 
 
@@ -1,7 +1,8 @@
 import pygame
 import random
 import math
-from src import display
+import numpy
+from src import display, textures, animation, sounds, collision
 
 # constants
 friction = .2
@@ -14,6 +15,8 @@ fall_limit = -40
 
 volume = {"soft_land": .15, "hard_land": .5, "slash": 2, "crate_hit": .5, "equip_trowel": .25, "trowel_dig": .5,  "trowel_fail": .5}
 terrain = None
+space = None
+camera = None
 
 
 def play_sound(sound, multiplier):
@@ -22,14 +25,14 @@ def play_sound(sound, multiplier):
     else:
         value = 1.0
     value *= multiplier
-    effect = pygame.mixer.Sound("assets/sounds/" + sound + str(random.randint(0, 3)) + ".wav")
-    effect.set_volume(value)
-    if value > 0:
-        effect.play()
+    sounds.play(sound, value)
 
 
 class Entity(pygame.sprite.Sprite):
 
+    # entities are part of the world, so they move across the screen as the camera scrolls
+    scrolls = True
+
     def __init__(self, x, y, width, height, health, volume):
 
         # basic sprite setup
@@ -61,13 +64,22 @@ class Entity(pygame.sprite.Sprite):
         # collisions
         self.entities = []
 
+        # which sides touch terrain, and the position and terrain revision they were worked out for
+        self.contacts = {}
+        self.contact_key = None
+
+        # the normals of the terrain surfaces hit while moving last tick, 0 along an axis where nothing was
+        self.normal_x = 0
+        self.normal_y = 0
+
         self.parachute = None
 
     def engage_parachute(self, visual_draw_group):
         """for parachuting crates"""
         self.push(5, -5)
-        texture = pygame.image.load("assets/animations/parachute/0.png").convert()
+        texture = textures.load("assets/animations/parachute/0.png", colorkey=(0, 0, 0))
         self.parachute = display.Visual("parachute", self.rect.x, self.rect.y, 41, 64, texture, visual_draw_group)
+        self.parachute.scrolls = True
 
     def push(self, x_impulse, y_impulse):
         self.vel_x += x_impulse
@@ -82,27 +94,13 @@ class Entity(pygame.sprite.Sprite):
 
         # handles collisions with blocks on the left
         if self.colliding("-x") and self.vel_x < 0:
-            y = self.real_y + 0
-            dy = 0
-            while self.colliding("-x") and dy < 8:
-                self.real_y += 1
-                dy += 1
-            self.real_y = y
-            if dy == 8:
-                self.vel_x = int(-.25 * self.vel_x)
-                self.real_x = math.ceil((self.rect.x + self.hitbox_x) / 16) * 16 - 2 * self.hitbox_x - 1
+            self.vel_x = int(-.25 * self.vel_x)
+            self.real_x = math.ceil((self.rect.x + self.hitbox_x) / 16) * 16 - 2 * self.hitbox_x - 1
 
         # handles collisions with blocks on the right
         if self.colliding("+x") and self.vel_x > 0:
-            y = self.real_y + 0
-            dy = 0
-            while self.colliding("+x") and dy < 8:
-                self.real_y += 1
-                dy += 1
-            self.real_y = y
-            if dy == 8:
-                self.vel_x = int(-.25 * self.vel_x)
-                self.real_x = math.ceil((self.rect.x + self.hitbox_x) / 16) * 16 - 2 * self.hitbox_x + 1
+            self.vel_x = int(-.25 * self.vel_x)
+            self.real_x = math.ceil((self.rect.x + self.hitbox_x) / 16) * 16 - 2 * self.hitbox_x + 1
 
         # handles falling
         if self.colliding("-y") and self.vel_y < 0:
@@ -131,21 +129,26 @@ class Entity(pygame.sprite.Sprite):
     def colliding(self, direction):
         """tests for collisions against blocks in specific orientations"""
 
+        key = (self.rect.x, self.rect.y, self.hitbox_x, self.hitbox_y, terrain, terrain.revision)
+        if key != self.contact_key:
+            self.update_contacts()
+            self.contact_key = key
+        return self.contacts.get(direction)
+
+    def update_contacts(self):
+        """works out which of the four sides touch blocks, all at once"""
+
         lower_x = (self.rect.x - self.hitbox_x + 8) // 16
         upper_x = (self.rect.x + self.hitbox_x + 7) // 16
         lower_y = int((self.rect.y + 2 * self.hitbox_y) // 16)
         upper_y = self.rect.y // 16
-        try:
-            if direction == "+x":
-                return terrain.world[lower_y - 1][upper_x] != 0 or terrain.world[upper_y][upper_x] != 0
-            elif direction == "-x":
-                return terrain.world[lower_y - 1][lower_x] != 0 or terrain.world[upper_y][lower_x] != 0
-            elif direction == "+y":
-                return terrain.world[upper_y][lower_x] != 0 or terrain.world[upper_y][upper_x] != 0
-            elif direction == "-y":
-                return terrain.world[lower_y][lower_x] != 0 or terrain.world[lower_y][upper_x] != 0
-        except IndexError:
-            return False
+        sides = (("+x", (lower_y - 1, upper_x), (upper_y, upper_x)), ("-x", (lower_y - 1, lower_x), (upper_y, lower_x)),
+                 ("+y", (upper_y, lower_x), (upper_y, upper_x)), ("-y", (lower_y, lower_x), (lower_y, upper_x)))
+        for direction, first, second in sides:
+            try:
+                self.contacts[direction] = bool(terrain.world[first] != 0 or terrain.world[second] != 0)
+            except IndexError:
+                self.contacts[direction] = False
 
     def friction(self):
 
@@ -159,9 +162,13 @@ class Entity(pygame.sprite.Sprite):
 
         self.update_collisions()
 
-        self.real_x += (self.vel_x / 10)
+        # the move stops as soon as it reaches into a block, so the collisions are picked up next tick
+        moved_x, moved_y, self.normal_x, self.normal_y = collision.sweep(
+            terrain.world, self.real_x - self.hitbox_x + 8, self.real_y, 2 * self.hitbox_x, 2 * self.hitbox_y,
+            self.vel_x / 10, -self.vel_y / 5)
+        self.real_x += moved_x
         self.rect.x = int(self.real_x)
-        self.real_y -= (self.vel_y / 5)
+        self.real_y += moved_y
         self.rect.y = int(self.real_y)
 
         if abs(self.vel_x) < .5:
@@ -196,6 +203,7 @@ class Player(Entity):
         self.speed_limit = walk_speed
         self.accel_limit = walk_accel
         self.skin = skin
+        self.clip = animation.clip("assets/animations/" + skin, 16, 4, 7, colorkey=(0, 0, 0), flip=True)
         self.terrain = world
         self.alive = True
 
@@ -205,11 +213,12 @@ class Player(Entity):
         self.px_offset = 8
         self.py_offset = 30
 
-        # setting up health bar
+        # setting up health bar, which is drawn as part of the hud along with the hotbar
         self.visual_draw_group = draw_groups[1]
-        texture = pygame.image.load("assets/displays/health.png").convert()
+        self.hud = display.Hud("hud", self.visual_draw_group)
+        texture = textures.load("assets/displays/health.png", colorkey=(0, 0, 0))
         bar_color = (150, 30, 30)
-        self.health_bar = display.Meter("health_bar", hotbar_x + 40, hotbar_y + 40, 408, 42, texture, self.health, bar_color, self.visual_draw_group)
+        self.health_bar = display.Meter("health_bar", hotbar_x + 40, hotbar_y + 40, 408, 42, texture, self.health, bar_color, self.hud.widgets)
         self.health_bar_particles = Particles(self.health_bar, [(150, 30, 30)], self.particle_draw_group)
 
         self.force_group = draw_groups[2]
@@ -231,19 +240,22 @@ class Player(Entity):
         self.damage_indicator_timer = 0
 
         # inventory visuals
-        texture = pygame.image.load("assets/displays/hotbar.png").convert()
-        self.hotbar = display.Menu("hotbar", hotbar_x + 40, hotbar_y + 100, 364, 50, texture, self.visual_draw_group)
-        texture = pygame.image.load("assets/displays/selected_slot.png").convert()
-        self.hotbar.add(display.Visual("selected_slot", 372, 0, 64, 64, texture, self.visual_draw_group))
-        texture = pygame.image.load("assets/displays/selection_arrow.png").convert()
-        self.hotbar.add(display.Visual("selection_arrow", 0, 0, 48, 24, texture, self.visual_draw_group))
+        texture = textures.load("assets/displays/hotbar.png", colorkey=(0, 0, 0))
+        self.hotbar = display.Menu("hotbar", hotbar_x + 40, hotbar_y + 100, 364, 50, texture, self.hud.widgets)
+        texture = textures.load("assets/displays/selected_slot.png", colorkey=(0, 0, 0))
+        self.hotbar.add(display.Visual("selected_slot", 372, 0, 64, 64, texture, self.hud.widgets))
+        texture = textures.load("assets/displays/selection_arrow.png", colorkey=(0, 0, 0))
+        self.hotbar.add(display.Visual("selection_arrow", 0, 0, 48, 24, texture, self.hud.widgets))
 
         self.reselect_item(0)
 
         texture = pygame.Surface([64, 32])
         texture.fill((0, 0, 0))
+        texture.set_colorkey((0, 0, 0))
         self.guide = display.Visual("guide", self.rect.x, self.rect.y, 64, 32, texture, self.visual_draw_group)
         self.indicator = display.Visual("indicator", self.rect.x, self.rect.y - 20, 17, 12, texture, self.visual_draw_group)
+        self.guide.scrolls = True
+        self.indicator.scrolls = True
         self.item_type = {"sword": "melee",
                           "arrows": "projectile",
                           "explosive_arrows": "projectile",
@@ -269,6 +281,7 @@ class Player(Entity):
         self.health_bar.kill()
         self.health_bar_particles.kill()
         self.hotbar.kill()
+        self.hud.kill()
         self.indicator.kill()
         self.guide.kill()
         if self.parachute is not None:
@@ -433,9 +446,9 @@ class Player(Entity):
         elif len(self.items) < 8 and quantity > 0:
             self.items.append(item)
             self.quantities[item] = quantity
-            texture = pygame.image.load("assets/items/" + item + ".png")
-            item_visual = display.Visual(item, (len(self.items) - 1) * 45 - 7, -7, 32, 32, texture, self.visual_draw_group)
-            item_number = display.Number("item", (len(self.items) - 1) * 45 + 24, 56, self.visual_draw_group)
+            texture = textures.load("assets/items/" + item + ".png", True, (0, 0, 0))
+            item_visual = display.Visual(item, (len(self.items) - 1) * 45 - 7, -7, 32, 32, texture, self.hud.widgets)
+            item_number = display.Number("item", (len(self.items) - 1) * 45 + 24, 56, self.hud.widgets)
             item_number.add(quantity)
             item_visual.parent(item_number)
 
@@ -546,17 +559,13 @@ class Player(Entity):
             mode = 1
         elif abs(self.vel_x) > 6:
             mode = 2
-        frame = self.animation // 7
 
-        self.image = pygame.image.load("assets/animations/" + self.skin + "/" + str(frame + (mode * 4)) + ".png").convert()
-        if not self.right:
-            self.image = pygame.transform.flip(self.image, True, False)
-        self.image.set_colorkey((0, 0, 0))
+        self.image = self.clip.at(mode, self.animation, self.right)
 
     def update(self):
 
-        # instant kill if the player falls into the void
-        if self.rect.y > 2000 and self.alive:
+        # instant kill if the player falls into the void, which starts well below the bottom of the world
+        if self.rect.y > max(2000, self.terrain.height * 16 + 1520) and self.alive:
             self.damage(-100, self)
 
         # friction is applied if the Player stops accelerating or if velocity is over the current limit
@@ -599,6 +608,7 @@ class Crate(Entity):
                            ("dynamite", 5), ("fireworks", 10)]
         self.engage_parachute(visual_draw_group)
         self.decay = 0
+        self.clip = animation.clip("assets/animations/crate", 4, alpha=True)
 
     def kill(self):
         if self.parachute is not None:
@@ -628,7 +638,7 @@ class Crate(Entity):
                 self.parachute = None
             self.kill()
             return
-        self.image = pygame.image.load("assets/animations/crate/" + str(int((30 - self.health) // 8)) + ".png")
+        self.image = self.clip.frame(int((30 - self.health) // 8))
 
 
 class Arrow(Entity):
@@ -639,7 +649,8 @@ class Arrow(Entity):
         self.source = source
         self.angle = angle
         self.force_group = force_group
-        self.image = pygame.image.load("assets/animations/arrow.png")
+        self.texture = textures.load("assets/animations/arrow.png", True)
+        self.image = self.texture
         self.push(force * math.cos(math.radians(angle)), force * math.sin(math.radians(angle)))
         self.life = 1000
 
@@ -671,7 +682,7 @@ class Arrow(Entity):
             y += self.rect.y
 
             try:
-                self.image = pygame.transform.rotate(pygame.image.load("assets/animations/arrow.png"), math.degrees(math.atan(self.vel_y/self.vel_x)))
+                self.image = textures.rotate(self.texture, math.degrees(math.atan(self.vel_y/self.vel_x)))
                 self.rect = self.image.get_rect(center=(x, y))
             except ZeroDivisionError:
                 pass
@@ -695,7 +706,7 @@ class Log(Entity):
 
         Entity.__init__(self, x, y, 14, 14, 60, 1)
         self.source = source
-        self.image = pygame.image.load("assets/animations/log.png")
+        self.image = textures.load("assets/animations/log.png", True)
         self.life = 1000
         if right:
             x = 10
@@ -792,7 +803,8 @@ class Dynamite(Explosive):
         x = 20
         if not right:
             x = -20
-        self.image = pygame.image.load("assets/animations/dynamite/0.png")
+        self.clip = animation.clip("assets/animations/dynamite", 26, ticks_per_frame=8, alpha=True)
+        self.image = self.clip.frame(0)
         self.push(x, 10)
         self.px_offset = 0
         self.py_offset = -8
@@ -806,7 +818,7 @@ class Dynamite(Explosive):
             self.kill()
         else:
             Entity.update(self)
-            self.image = pygame.image.load("assets/animations/dynamite/" + str(self.fuse // 8) + ".png")
+            self.image = self.clip.at(0, self.fuse)
             self.sparks.spawn(1, (2, 2), 8, 4, True)
             self.fuse += 1
 
@@ -822,7 +834,8 @@ class Fireworks(Explosive):
         if not right:
             x = -10
         self.push(x, 10)
-        self.image = pygame.image.load("assets/animations/fireworks/0.png")
+        self.clip = animation.clip("assets/animations/fireworks", 38, 34, 8, alpha=True)
+        self.image = self.clip.frame(0)
         self.px_offset = -6
         self.py_offset = 0
         self.explosion.colors = [(255, 140, 0), (255, 255, 255), (0, 0, 255)]
@@ -830,18 +843,18 @@ class Fireworks(Explosive):
     def update(self):
         Entity.update(self)
         if self.fuse < 272:
-            self.image = pygame.image.load("assets/animations/fireworks/" + str(self.fuse // 8) + ".png")
+            self.image = self.clip.at(0, self.fuse)
         elif self.fuse == 280:
-            self.image = pygame.image.load("assets/animations/fireworks/34.png")
+            self.image = self.clip.frame(34)
             self.force_group.add(Firework(self.rect.x + 8, self.rect.y - 8, "red_firework", 20, 30, self.particle_group, self.force_group, self.source))
         elif self.fuse == 310:
-            self.image = pygame.image.load("assets/animations/fireworks/35.png")
+            self.image = self.clip.frame(35)
             self.force_group.add(Firework(self.rect.x + 8, self.rect.y - 8, "green_firework", -10, 50, self.particle_group, self.force_group, self.source))
         elif self.fuse == 345:
-            self.image = pygame.image.load("assets/animations/fireworks/36.png")
+            self.image = self.clip.frame(36)
             self.force_group.add(Firework(self.rect.x + 8, self.rect.y - 8, "blue_firework", -30, 40, self.particle_group, self.force_group, self.source))
         elif self.fuse == 450:
-            self.image = pygame.image.load("assets/animations/fireworks/37.png")
+            self.image = self.clip.frame(37)
             self.px_offset = 16
             self.py_offset = 32
             self.detonate(10, 20, 3, 2, 10, 20, 60, False, 15, 10)
@@ -856,7 +869,7 @@ class Firework(Explosive):
 
         Explosive.__init__(self, x, y, 5, 15, particle_group, force_group, source)
         self.push(-angle, 60)
-        self.image = pygame.transform.rotate(pygame.image.load("assets/animations/fireworks/" + name + ".png"), angle)
+        self.image = textures.rotate(textures.load("assets/animations/fireworks/" + name + ".png", True), angle)
         self.name = name
         self.fuse = duration
         self.px_offset = 0
@@ -910,28 +923,165 @@ class Particles(Entity):
             xfl, xfu = int(force - variance), int(force + variance)
             yfl, yfu = int(force), int(2 * force)
 
-        for each in range(number):
-            self.draw_group.add(Particle(self.colors[random.randint(0, len(self.colors) - 1)], random.randint(xl, xu), random.randint(yl, yu), random.randint(xfl, xfu), random.randint(yfl, yfu), size))
+        self.draw_group.emit(number, self.colors, (xl, xu), (yl, yu), (xfl, xfu), (yfl, yfu), size)
 
     def goto(self):
         self.rect.x = self.parent.rect.x + self.parent.px_offset
         self.rect.y = self.parent.rect.y + self.parent.py_offset
 
+        # things fixed to the screen, like health bars, give off particles in the part of the world behind them
+        if camera is not None and not self.parent.scrolls:
+            self.rect.x, self.rect.y = camera.to_world(self.rect.topleft)
+
+
+class ParticleSystem:
+    """every live particle stored as rows of NumPy arrays, so they are spawned, moved and drawn in batches"""
+
+    def __init__(self, capacity=1024):
+
+        self.count = 0
+        self.capacity = capacity
+
+        # positions and velocities are [x, y, vel_x, vel_y], sizes are [width, height]
+        self.motion = numpy.zeros((capacity, 4))
+        self.size = numpy.zeros((capacity, 2), numpy.int32)
+        self.color = numpy.zeros((capacity, 3), numpy.uint8)
+        self.life = numpy.zeros(capacity, numpy.int32)
 
-class Particle(Entity):
-    def __init__(self, color, x, y, x_force, y_force, size):
-        Entity.__init__(self, x, y, 2, 2, 1, 0)
-        self.rect = pygame.Rect((x, y), size, center=(x, y))
-        self.image = pygame.Surface(size)
-        self.image.fill(color)
-        self.push(x_force, y_force)
-        self.life = 60
+        # particles are purely visual, so they draw from their own generator instead of the game's
+        self.random = numpy.random.default_rng(random.getrandbits(32))
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, number):
+        """grows the arrays so that number more particles fit"""
+
+        if self.count + number <= self.capacity:
+            return
+        while self.count + number > self.capacity:
+            self.capacity *= 2
+        for name in ("motion", "size", "color", "life"):
+            old = getattr(self, name)
+            new = numpy.zeros((self.capacity,) + old.shape[1:], old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, number, colors, x_range, y_range, x_force_range, y_force_range, size):
+        """adds number particles with positions and forces picked uniformly from the inclusive ranges"""
+
+        if number <= 0:
+            return
+        self.reserve(number)
+        new = slice(self.count, self.count + number)
+        ranges = (x_range, y_range, x_force_range, y_force_range)
+        for column in range(4):
+            lower, upper = ranges[column]
+            self.motion[new, column] = self.random.integers(lower, upper + 1, number)
+        self.size[new] = size
+        self.color[new] = numpy.array(colors, numpy.uint8)[self.random.integers(0, len(colors), number)]
+        self.life[new] = 60
+        self.count += number
+
+    def solid(self, x, y):
+        """whether the tiles under each pixel coordinate are solid, treating anything outside the world as air"""
+
+        result = numpy.zeros(len(x), bool)
+        if terrain is None:
+            return result
+        column = numpy.floor(x).astype(numpy.int64) // 16
+        row = numpy.floor(y).astype(numpy.int64) // 16
+        inside = (0 <= column) & (column < terrain.length) & (0 <= row) & (row < terrain.height)
+        result[inside] = terrain.world[row[inside], column[inside]] != 0
+        return result
 
     def update(self):
-        Entity.update(self)
-        self.life -= 1
-        if self.life < 0:
-            self.kill()
+        """a simplified, vectorized version of Entity.update for every particle at once"""
+
+        # these are views into the arrays, so updating them in place updates the particles
+        live = slice(0, self.count)
+        x, y, vel_x, vel_y = self.motion[live].T
+        width, height = self.size[live].T
+
+        vel_x -= friction * numpy.sign(vel_x)
+
+        # the tiles directly below, above and in front of each particle
+        center = x + width / 2
+        ground = self.solid(center, y + height)
+        ceiling = self.solid(center, y - 1)
+        wall = self.solid(center + numpy.sign(vel_x) * (width / 2 + 1), y + height / 2)
+
+        landing = ground & (vel_y < 0)
+        vel_y[landing] = 0
+        y[landing] = numpy.floor((y[landing] + height[landing]) / 16) * 16 - height[landing]
+        vel_y[~ground & (vel_y > fall_limit)] += gravity
+        bumping = ceiling & (vel_y > 0)
+        vel_y[bumping] *= -.5
+        vel_x[wall] = numpy.trunc(-.25 * vel_x[wall])
+
+        x += vel_x / 10
+        y -= vel_y / 5
+        vel_x[numpy.abs(vel_x) < .5] = 0
+
+        # dead particles are dropped by packing the live ones to the front
+        self.life[live] -= 1
+        alive = self.life[live] >= 0
+        remaining = int(numpy.count_nonzero(alive))
+        if remaining < self.count:
+            for array in (self.motion, self.size, self.color, self.life):
+                array[:remaining] = array[live][alive]
+            self.count = remaining
+
+    def cells(self, size, offset=(0, 0)):
+        """the (column, row) of every size by size pixel cell on screen that has a particle in it,
+        with the world scrolled by offset"""
+
+        if self.count == 0:
+            return set()
+        positions = numpy.floor(self.motion[:self.count, :2]).astype(numpy.int64) - offset
+        first = positions // size
+        last = (positions + self.size[:self.count] - 1) // size
+
+        # each corner's cell is packed into one integer so duplicates can be dropped with a flat unique
+        columns = numpy.concatenate((first[:, 0], last[:, 0], first[:, 0], last[:, 0])) + (1 << 31)
+        rows = numpy.concatenate((first[:, 1], last[:, 1], last[:, 1], first[:, 1])) + (1 << 31)
+        packed = numpy.unique((columns << 32) | rows)
+        return set(zip(((packed >> 32) - (1 << 31)).tolist(), ((packed & 0xFFFFFFFF) - (1 << 31)).tolist()))
+
+    def draw(self, surface, areas=None, offset=(0, 0)):
+        """writes every particle's pixels into the surface in one pass, only inside areas if a list of rects is given;
+        offset is how far the world is scrolled"""
+
+        if self.count == 0:
+            return
+        try:
+            pixels = pygame.surfarray.pixels2d(surface)
+        except (ValueError, pygame.error):
+            for index in range(self.count):
+                x, y = self.motion[index, :2]
+                surface.fill(self.color[index], (int(x) - offset[0], int(y) - offset[1], self.size[index, 0], self.size[index, 1]))
+            return
+
+        # only pixels inside the surface's clipping area are written, the same as with a blit
+        if areas is None:
+            areas = [surface.get_clip()]
+        else:
+            areas = [area.clip(surface.get_clip()) for area in areas]
+        positions = numpy.floor(self.motion[:self.count, :2]).astype(numpy.int64) - offset
+        sizes = self.size[:self.count]
+        colors = pygame.surfarray.map_array(surface, self.color[:self.count].astype(numpy.int32))
+
+        # each pixel offset inside the largest particle is written for every particle that covers it
+        for offset_x in range(int(sizes[:, 0].max())):
+            for offset_y in range(int(sizes[:, 1].max())):
+                x = positions[:, 0] + offset_x
+                y = positions[:, 1] + offset_y
+                inside = numpy.zeros(self.count, bool)
+                for clip in areas:
+                    inside |= (clip.left <= x) & (x < clip.right) & (clip.top <= y) & (y < clip.bottom)
+                covered = inside & (offset_x < sizes[:, 0]) & (offset_y < sizes[:, 1])
+                pixels[x[covered], y[covered]] = colors[covered]
+        del pixels
 
 
 class Force(Entity):
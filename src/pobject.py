@@ -1,4 +1,5 @@
 import pygame, math
+from src import textures
 
 terrain = []
 friction = .1
@@ -38,7 +39,7 @@ class pobject(pygame.sprite.Sprite):
     def __init__(self):
 
         pygame.sprite.Sprite.__init__(self)
-        self.texture = pygame.image.load("assets/animations/example_player/0.png")
+        self.texture = textures.load("assets/animations/example_player/0.png", True)
         # self.texture.fill((255, 255, 200))
         self.image = self.texture.copy()
         self.rect = self.texture.get_rect()
@@ -88,7 +89,7 @@ class pobject(pygame.sprite.Sprite):
         if -20 < self.y_velocity:
             self.y_velocity -= .2
         x, y = self.center
-        self.image = pygame.transform.rotate(self.texture, math.degrees(self.rotation))
+        self.image = textures.rotate(self.texture, math.degrees(self.rotation))
         self.colliding()
         self.rect.x += self.x_velocity
         self.rect.y -= self.y_velocity
@@ -0,0 +1,105 @@
+import pygame
+import time
+import json
+import csv
+from collections import deque
+
+# frames of history kept for every phase, and where and how often to write it out (None to never write it)
+history = 600
+dump_path = None
+dump_every = 600
+
+
+class FrameTimer:
+    """times the named phases of every frame and keeps a rolling history of each"""
+
+    def __init__(self, length=history, path=None, every=None):
+
+        self.clock = time.perf_counter
+        self.length = length
+        self.path = path if path is not None else dump_path
+        self.every = every if every is not None else dump_every
+
+        # phase -> recent times in milliseconds, group -> recent sprite counts
+        self.phases = {}
+        self.counts = {}
+
+        self.frame = {}
+        self.frames = 0
+        self.last = self.clock()
+
+        self.overlay_surface = None
+        self.font = None
+
+    def begin(self):
+        self.frame = {}
+        self.last = self.clock()
+
+    def mark(self, phase):
+        """ends the current phase; marking the same phase twice in a frame adds the times together"""
+
+        now = self.clock()
+        self.frame[phase] = self.frame.get(phase, 0) + (now - self.last) * 1000
+        self.last = now
+
+    def end(self, counts):
+        """files the frame's phase times and the sizes of the sprite groups"""
+
+        for phase in self.frame:
+            if phase not in self.phases:
+                self.phases[phase] = deque(maxlen=self.length)
+            self.phases[phase].append(self.frame[phase])
+        for group in counts:
+            if group not in self.counts:
+                self.counts[group] = deque(maxlen=self.length)
+            self.counts[group].append(counts[group])
+
+        self.frames += 1
+        if self.path is not None and self.every and self.frames % self.every == 0:
+            self.dump(self.path)
+
+    def summary(self):
+        """percentiles of every phase over the history, in milliseconds"""
+
+        result = {}
+        for phase in self.phases:
+            ordered = sorted(self.phases[phase])
+            result[phase] = {"p50": ordered[len(ordered) // 2], "p90": ordered[int(len(ordered) * .9)],
+                             "p99": ordered[int(len(ordered) * .99)], "max": ordered[-1],
+                             "mean": sum(ordered) / len(ordered)}
+        return result
+
+    def latest_counts(self):
+        return dict((group, self.counts[group][-1]) for group in self.counts)
+
+    def dump(self, path):
+        """writes the summary to path.json and path.csv"""
+
+        summary = self.summary()
+        with open(path + ".json", "w") as file:
+            json.dump({"frames": self.frames, "phases": summary, "counts": self.latest_counts()}, file, indent=2)
+        with open(path + ".csv", "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["phase", "p50", "p90", "p99", "max", "mean"])
+            for phase in summary:
+                writer.writerow([phase] + ["%.4f" % summary[phase][key] for key in ("p50", "p90", "p99", "max", "mean")])
+            for group, count in self.latest_counts().items():
+                writer.writerow([group + "_count", count])
+
+    def overlay(self):
+        """a surface listing the phase times, only re-rendered every 30 frames to keep it cheap"""
+
+        if self.overlay_surface is None or self.frames % 30 == 0:
+            if self.font is None:
+                self.font = pygame.font.Font(None, 20)
+            summary = self.summary()
+            lines = [(phase, "%.2f / %.2f ms" % (summary[phase]["mean"], summary[phase]["p99"])) for phase in summary]
+            lines += [(group, str(count)) for group, count in self.latest_counts().items()]
+            surface = pygame.Surface([280, 16 * len(lines) + 8], pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 160))
+            for index in range(len(lines)):
+                name, value = lines[index]
+                surface.blit(self.font.render(name, True, (255, 255, 255)), (6, 4 + 16 * index))
+                surface.blit(self.font.render(value, True, (255, 255, 255)), (140, 4 + 16 * index))
+            self.overlay_surface = surface
+        return self.overlay_surface
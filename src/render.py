@@ -0,0 +1,244 @@
+import pygame
+
+# changed areas of the screen are rounded out to cells this many pixels across
+cell_size = 64
+
+# size of the screen everything is drawn to, which is then scaled to fit the window
+resolution = (1440, 900)
+
+# how the screen is scaled to the window: "integer" keeps pixels square by only scaling by whole numbers when the
+# window is big enough, "fit" fills as much of the window as it can, and "smooth" does the same with filtering
+scaling = "integer"
+
+
+class DirtyRenderer:
+    """redraws only the cells of the screen that something moved or changed in, instead of the whole frame"""
+
+    def __init__(self, background_color, size=cell_size):
+
+        self.background_color = background_color
+        self.size = size
+
+        # key -> (image, area) for everything drawn last frame, and the cells particles were in
+        self.drawn = {}
+        self.particle_cells = set()
+        self.offset = (0, 0)
+        self.full = True
+
+    def invalidate(self):
+        """makes the next frame redraw the whole screen"""
+        self.full = True
+
+    def cells(self, rect):
+        left = rect.left // self.size
+        top = rect.top // self.size
+        right = max(rect.left, rect.right - 1) // self.size
+        bottom = max(rect.top, rect.bottom - 1) // self.size
+        return set((column, row) for column in range(left, right + 1) for row in range(top, bottom + 1))
+
+    def changed(self, key, image, area, seen):
+        """the cells to redraw for one image: none if it is the same image in the same place as last frame"""
+
+        seen[key] = (image, area)
+        before = self.drawn.pop(key, None)
+        if before is None:
+            return self.cells(area)
+        if before[0] is not image or before[1] != area:
+            return self.cells(area) | self.cells(before[1])
+        return set()
+
+    def merge(self, cells, bounds):
+        """joins dirty cells into runs along each row, then stacks runs that match the one in the row above"""
+
+        rows = {}
+        for column, row in cells:
+            rows.setdefault(row, []).append(column)
+
+        rects = []
+        above = {}
+        for row in sorted(rows):
+            columns = sorted(rows[row])
+            runs = []
+            start = columns[0]
+            for previous, column in zip(columns, columns[1:]):
+                if column != previous + 1:
+                    runs.append((start, previous))
+                    start = column
+            runs.append((start, columns[-1]))
+
+            current = {}
+            for start, end in runs:
+                rect = above.get((start, end))
+                if rect is not None and rect.bottom == row * self.size:
+                    rect.height += self.size
+                else:
+                    rect = pygame.Rect(start * self.size, row * self.size, (end - start + 1) * self.size, self.size)
+                    rects.append(rect)
+                current[(start, end)] = rect
+            above = current
+
+        return [rect.clip(bounds) for rect in rects if rect.colliderect(bounds)]
+
+    def draw(self, surface, layers, overlays=(), offset=(0, 0)):
+        """draws the layers back to front, but only where something changed, returning the areas that were redrawn
+
+        layers can be sprite groups, particle systems (with cells and draw) and worlds (with chunks and draw);
+        overlays are (image, position) pairs drawn over everything else. offset is how far particle systems and
+        worlds are scrolled; sprites are expected to be in their screen positions already"""
+
+        # scrolling moves everything
+        if offset != self.offset:
+            self.offset = offset
+            self.full = True
+
+        dirty = set()
+        seen = {}
+        placed = []
+        for layer in layers:
+            if isinstance(layer, pygame.sprite.AbstractGroup):
+                images = []
+                areas = []
+                for sprite in layer:
+                    area = pygame.Rect(sprite.rect.topleft, sprite.image.get_size())
+                    dirty |= self.changed(sprite, sprite.image, area, seen)
+                    images.append(sprite.image)
+                    areas.append(area)
+                placed.append((images, areas))
+            elif hasattr(layer, "cells"):
+                cells = layer.cells(self.size, offset)
+                dirty |= cells | self.particle_cells
+                self.particle_cells = cells
+                placed.append(None)
+            else:
+                for area in layer.chunks.refresh():
+                    dirty |= self.cells(area.move(-offset[0], -offset[1]))
+                placed.append(None)
+
+        overlay_images = []
+        overlay_areas = []
+        for index in range(len(overlays)):
+            image, position = overlays[index]
+            area = pygame.Rect(position, image.get_size())
+            dirty |= self.changed(("overlay", index), image, area, seen)
+            overlay_images.append(image)
+            overlay_areas.append(area)
+
+        # whatever disappeared since last frame leaves a hole to fill in
+        for image, area in self.drawn.values():
+            dirty |= self.cells(area)
+        self.drawn = seen
+
+        bounds = surface.get_rect()
+        if self.full:
+            dirty = self.cells(bounds)
+            self.full = False
+        if not dirty:
+            return []
+        areas = self.merge(dirty, bounds)
+
+        # the areas never overlap, so each layer can be drawn into all of them before moving on to the next
+        for area in areas:
+            surface.fill(self.background_color, area)
+        for index in range(len(layers)):
+            layer = layers[index]
+            if hasattr(layer, "cells"):
+                layer.draw(surface, areas, offset)
+                continue
+            for area in areas:
+                surface.set_clip(area)
+                if placed[index] is not None:
+                    blit(surface, placed[index][0], placed[index][1], area)
+                else:
+                    layer.draw(surface, area, offset)
+            surface.set_clip(None)
+        for area in areas:
+            surface.set_clip(area)
+            blit(surface, overlay_images, overlay_areas, area)
+        surface.set_clip(None)
+        return areas
+
+
+def blit(surface, images, rects, area):
+    """blits the images whose rects overlap area"""
+    for index in area.collidelistall(rects):
+        surface.blit(images[index], rects[index])
+
+
+class Scaler:
+    """draws a screen of a fixed size into a window of any size, keeping its shape with black bars around it"""
+
+    def __init__(self, window, size=resolution, mode=None):
+
+        self.window = window
+        self.mode = mode if mode is not None else scaling
+
+        # everything is drawn here, in the same format as the window so scaling never has to convert
+        self.surface = pygame.Surface(size, 0, window)
+
+        # the window size the placement below was worked out for
+        self.window_size = None
+        self.rect = None
+        self.factor = None
+        self.target = None
+
+    def resize(self):
+        """works out where the screen goes in the window, which only has to be done when the window changes size"""
+
+        self.window_size = self.window.get_size()
+        width, height = self.surface.get_size()
+        factor = min(self.window_size[0] / width, self.window_size[1] / height)
+        if self.mode == "integer" and factor >= 1:
+            factor = int(factor)
+        size = (max(int(width * factor), 1), max(int(height * factor), 1))
+        self.rect = pygame.Rect((0, 0), size)
+        self.rect.center = self.window.get_rect().center
+
+        # a whole number factor lets changed areas be scaled on their own, since every pixel maps to a block of pixels
+        self.factor = factor if factor == int(factor) and self.mode != "smooth" else None
+
+        # the part of the window the screen is scaled straight into
+        self.target = self.window.subsurface(self.rect)
+        self.window.fill((0, 0, 0))
+
+    def invalidate(self):
+        """makes the next present clear the window and copy over the whole screen"""
+        self.window_size = None
+
+    def present(self, areas=None):
+        """copies the screen, or only the areas of it given, to the window; returns the areas of the window that
+        changed, or None if it all did"""
+
+        if self.window.get_size() != self.window_size:
+            self.resize()
+            areas = None
+        if areas is not None and not areas:
+            return areas
+
+        if self.factor == 1:
+            if areas is None:
+                self.window.blit(self.surface, self.rect)
+                return None
+            for area in areas:
+                self.window.blit(self.surface, area.move(self.rect.topleft), area)
+            return [area.move(self.rect.topleft) for area in areas]
+
+        if areas is not None and self.factor is not None:
+            factor = int(self.factor)
+            changed = []
+            for area in areas:
+                scaled = pygame.Rect(area.x * factor, area.y * factor, area.width * factor, area.height * factor)
+                pygame.transform.scale(self.surface.subsurface(area), scaled.size, self.target.subsurface(scaled))
+                changed.append(scaled.move(self.rect.topleft))
+            return changed
+
+        if self.mode == "smooth" and self.surface.get_bitsize() >= 24:
+            pygame.transform.smoothscale(self.surface, self.rect.size, self.target)
+        else:
+            pygame.transform.scale(self.surface, self.rect.size, self.target)
+        return None if areas is None else [self.rect]
+
+    def to_screen(self, position):
+        """converts a position in the window, like the mouse's, to one on the screen"""
+        x = (position[0] - self.rect.x) * self.surface.get_width() / self.rect.width
+        y = (position[1] - self.rect.y) * self.surface.get_height() / self.rect.height
+        return int(x), int(y)
@@ -0,0 +1,70 @@
+import pygame
+import struct
+import zlib
+import os
+
+# replay files: a header with everything needed to set the match up again, then the key presses and releases
+# the players were given as deflated (tick, released, key) records
+replay_header = struct.Struct("<4sHqIII")
+replay_magic = b"RPLY"
+replay_version = 1
+key_record = struct.Struct("<IBI")
+
+
+class Replay:
+    """the seed, world size and per-tick key events of a match, which is all it takes to play it again exactly"""
+
+    def __init__(self, seed, length, height):
+
+        # checked now rather than when the match is over and the replay is saved
+        if not -1 << 63 <= seed < 1 << 63:
+            raise ValueError("replays can only record seeds that fit in 64 bits")
+        self.seed = seed
+        self.length = length
+        self.height = height
+
+        # how many ticks the match ran for, and tick -> [(event type, key)] for the ticks that had any
+        self.ticks = 0
+        self.keys = {}
+
+    def record(self, tick, events):
+        """files the key events the players were given on a tick"""
+
+        keys = [(event.type, event.key) for event in events if event.type in (pygame.KEYDOWN, pygame.KEYUP)]
+        if keys:
+            self.keys.setdefault(tick, []).extend(keys)
+        self.ticks = max(self.ticks, tick + 1)
+
+    def events(self, tick):
+        """the key events recorded on a tick, as new events"""
+        return [pygame.event.Event(kind, key=key) for kind, key in self.keys.get(tick, ())]
+
+    def save(self, path):
+        """writes the replay to path, replacing the file in one step"""
+
+        records = b"".join(key_record.pack(tick, kind == pygame.KEYUP, key)
+                           for tick in sorted(self.keys) for kind, key in self.keys[tick])
+
+        header = replay_header.pack(replay_magic, replay_version, self.seed, self.length, self.height, self.ticks)
+
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(header)
+            file.write(zlib.compress(records, 9))
+        os.replace(temporary, path)
+
+
+def load(path):
+    """reads a replay written by Replay.save"""
+
+    with open(path, "rb") as file:
+        magic, version, seed, length, height, ticks = replay_header.unpack(file.read(replay_header.size))
+        if magic != replay_magic or version > replay_version:
+            raise ValueError(path + " is not a replay this version can read")
+        records = zlib.decompress(file.read())
+
+    replay = Replay(seed, length, height)
+    replay.ticks = ticks
+    for tick, released, key in key_record.iter_unpack(records):
+        replay.keys.setdefault(tick, []).append((pygame.KEYUP if released else pygame.KEYDOWN, key))
+    return replay
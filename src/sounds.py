@@ -0,0 +1,85 @@
+import pygame
+import random
+import os
+
+# the most copies of a single sound that may play at once
+voice_limit = 4
+
+
+class SoundBank:
+    """decodes every variant of every sound effect once and plays them from memory"""
+
+    def __init__(self, directory, voice_limit):
+
+        self.directory = directory
+        self.voice_limit = voice_limit
+        self.muted = False
+
+        # name -> list of decoded variants, and name -> list of (channel, sound, priority) currently playing
+        self.sounds = {}
+        self.voices = {}
+
+        # a separate generator so that picking variants never disturbs the game's random state
+        self.random = random.Random()
+
+    def preload(self):
+        """decodes every "<name><variant>.wav" file in the directory"""
+
+        if not pygame.mixer.get_init():
+            return
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith(".wav"):
+                name = filename[:-4].rstrip("0123456789")
+                if name not in self.sounds:
+                    self.load(name)
+
+    def load(self, name):
+        variants = []
+        variant = 0
+        while os.path.exists(self.path(name, variant)):
+            variants.append(pygame.mixer.Sound(self.path(name, variant)))
+            variant += 1
+        self.sounds[name] = variants
+        return variants
+
+    def path(self, name, variant):
+        return os.path.join(self.directory, name + str(variant) + ".wav")
+
+    def play(self, name, volume, priority=None):
+        """plays a random variant of name, stealing the lowest priority voice if name is already at its voice limit"""
+
+        if volume <= 0 or self.muted or not pygame.mixer.get_init():
+            return None
+        if priority is None:
+            priority = volume
+
+        variants = self.sounds.get(name)
+        if variants is None:
+            variants = self.load(name)
+        if not variants:
+            return None
+
+        # forget voices that have finished or whose channel has been taken by another sound
+        voices = [voice for voice in self.voices.get(name, []) if voice[0].get_sound() is voice[1]]
+        if len(voices) >= self.voice_limit:
+            weakest = min(voices, key=lambda voice: voice[2])
+            if weakest[2] > priority:
+                self.voices[name] = voices
+                return None
+            weakest[0].stop()
+            voices.remove(weakest)
+
+        effect = variants[self.random.randint(0, len(variants) - 1)]
+        channel = effect.play()
+        if channel is not None:
+            channel.set_volume(volume)
+            voices.append((channel, effect, priority))
+        self.voices[name] = voices
+        return channel
+
+
+bank = SoundBank("assets/sounds", voice_limit)
+
+
+def play(name, volume, priority=None):
+    return bank.play(name, volume, priority)
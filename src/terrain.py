@@ -1,54 +1,182 @@
 import pygame
 import random
+import numpy
+import struct
+import zlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src import textures
 
 # static reference
 materials = ["dirt", "dirt2", "dirt3", "grass", "sand"]
 block_attributes = []
 
+# width and height of a terrain chunk in tiles, and how far tall textures like grass reach above their tile
+chunk_size = 16
+overhang = 8
+
+# rendered chunks further than this many chunks outside the view are dropped from memory
+keep_margin = 2
+
+# terrain noise: how many octaves are layered, how much each one counts compared to the one before,
+# and how tall the hills get in blocks above the lowest ground
+octaves = 4
+persistence = .5
+hill_range = 3, 20
+
+# worlds with at least this many tiles are generated in column ranges on a pool of this many processes
+parallel_tiles = 1 << 22
+workers = os.cpu_count() or 1
+
+# worlds at least this many blocks long are generated a band of chunk columns at a time, as things come near,
+# instead of all at once
+stream_length = 512
+
+# binary maps start with this header: magic, version, flags, length and height, followed by the tiles row by row,
+# one byte each, deflated if the compressed flag is set
+map_header = struct.Struct("<4sHHII")
+map_magic = b"TMAP"
+map_version = 1
+compressed = 1
+
+
+class Chunks:
+    """renders the terrain into cached chunk surfaces, redrawing only the chunks whose tiles have changed
+
+    chunks are only rendered once they come into view, and forgotten again once they are far out of it"""
+
+    def __init__(self, world, size=chunk_size):
+
+        self.world = world
+        self.size = size
+        self.columns = -(-world.length // size)
+        self.rows = -(-world.height // size)
+
+        # (column, row) -> rendered surface, or None for chunks with nothing in them
+        self.surfaces = {}
+        self.dirty = set((column, row) for column in range(self.columns) for row in range(self.rows))
+
+    def mark(self, x, y):
+        """flags the chunk holding the tile at x, y for redrawing"""
+
+        # negative indices wrap around the grid the same way they do when editing it
+        if x < 0:
+            x += self.world.length
+        if y < 0:
+            y += self.world.height
+        if 0 <= x < self.world.length and 0 <= y < self.world.height:
+            self.dirty.add((x // self.size, y // self.size))
+
+    def mark_region(self, x, y, width, height):
+        """flags every chunk overlapping a rectangle of tiles"""
+        for row in range(y // self.size, (y + height - 1) // self.size + 1):
+            for column in range(x // self.size, (x + width - 1) // self.size + 1):
+                self.dirty.add((column, row))
+
+    def mark_all(self):
+        self.dirty.update((column, row) for column in range(self.columns) for row in range(self.rows))
+
+    def render(self, column, row):
+        """draws one chunk's tiles onto a fresh transparent surface"""
+
+        tiles = self.world.world[row * self.size:(row + 1) * self.size, column * self.size:(column + 1) * self.size]
+        if not tiles.any():
+            return None
+
+        pixels = self.size * 16
+        surface = pygame.Surface([pixels, pixels + overhang], pygame.SRCALPHA)
+        for y, x in numpy.argwhere(tiles):
+            texture = block_attributes[tiles[y, x]]
+            surface.blit(texture, (x * 16, y * 16 + overhang + 16 - texture.get_height()))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+    def area(self, column, row):
+        """the part of the screen a chunk covers, including its overhang"""
+        pixels = self.size * 16
+        return pygame.Rect(column * pixels, row * pixels - overhang, pixels, pixels + overhang)
+
+    def refresh(self):
+        """forgets the surfaces of dirty chunks so they are rendered again when next drawn,
+        returning the areas of the world that changed"""
+
+        changed = []
+        for key in self.dirty:
+            self.surfaces.pop(key, None)
+            changed.append(self.area(*key))
+        self.dirty.clear()
+        return changed
+
+    def surface(self, column, row):
+        """the rendered chunk, rendering it first if it isn't in memory"""
+
+        key = (column, row)
+        if key not in self.surfaces:
+            self.surfaces[key] = self.render(column, row)
+        return self.surfaces[key]
+
+    def visible(self, view):
+        """the (column, row) of every chunk whose area overlaps view, a rect in world pixels, from top to bottom"""
+
+        pixels = self.size * 16
+        left = max(view.left // pixels, 0)
+        right = min((view.right - 1) // pixels + 1, self.columns)
+        top = max(view.top // pixels, 0)
+        bottom = min((view.bottom - 1 + overhang) // pixels + 1, self.rows)
+        return [(column, row) for row in range(top, bottom) for column in range(left, right)]
+
+    def keep(self, view, margin=keep_margin):
+        """drops the rendered chunks more than margin chunks outside view"""
+
+        pixels = self.size * 16
+        near = view.inflate(2 * margin * pixels, 2 * margin * pixels)
+        for key in [key for key in self.surfaces if not near.colliderect(self.area(*key))]:
+            del self.surfaces[key]
+
+    def draw(self, window, area=None, offset=(0, 0)):
+        """blits the chunks on screen, or only those overlapping area, from top to bottom so overhanging textures
+        overlap correctly; offset is how far the world is scrolled"""
 
-class Block(pygame.sprite.Sprite):
-    """base block"""
-
-    def __init__(self, material, x, y):
-        pygame.sprite.Sprite.__init__(self)
-        self.x = x
-        self.y = y
-        x *= 16
-        y *= 16
-        self.image = block_attributes[material]
-        self.rect = self.image.get_rect()
-        width, self.height = self.rect.size
-
-        if self.height == 16:
-            offset = 0
-        else:
-            offset = -8
-        self.rect = self.image.get_rect()
-        
-        self.rect.x = x
-        self.rect.y = y + offset
-
-    def kill(self):
-        self.rect = pygame.Rect((0, 0), (0, 0))
-        pygame.sprite.Sprite.kill(self)
+        self.refresh()
+
+        if area is None:
+            area = window.get_clip()
+        for column, row in self.visible(area.move(offset)):
+            surface = self.surface(column, row)
+            if surface is not None:
+                window.blit(surface, self.area(column, row).move(-offset[0], -offset[1]))
 
 
 class World:
     """contains blocks and manages them"""
 
-    def __init__(self, length, height, blocks):
+    def __init__(self, length, height):
 
         for material in range(len(materials)):
-            texture = pygame.image.load("assets/blocks/" + materials[material - 1] + ".png").convert()
+            colorkey = None
             if material == 4:
-                texture.set_colorkey((0, 0, 0))
-            block_attributes.append(texture)
+                colorkey = (0, 0, 0)
+            block_attributes.append(textures.load("assets/blocks/" + materials[material - 1] + ".png", colorkey=colorkey))
 
-        self.world = []
-        self.blocks = blocks
+        # the tile grid, indexed [row][column] or [row, column]; 0 is air and anything else is a material
+        self.world = numpy.zeros((height, length), numpy.uint8)
         self.collision_bounds = {}
         self.length = length
         self.height = height
+        self.chunks = Chunks(self)
+
+        # goes up every time a tile changes, so anything worked out from the grid can tell when it is stale
+        self.revision = 0
+        self.random = numpy.random.default_rng(random.getrandbits(32))
+
+        # chunk columns of a streamed world that haven't been generated yet, and the (seed, smoothness) to do it with
+        self.pending = set()
+        self.noise = None
+
+        # chunk column -> future of its tiles, for pending columns sent to the pool ahead of time
+        self.pool = None
+        self.prefetched = {}
 
     """def calculate_collision_bounds(self):
         top = []
@@ -91,128 +219,304 @@ class World:
         print("calculated collision bounds")"""
 
     def load(self, filename):
-        """loads an existing file into the self.world matrix"""
-
-        save = open(filename + ".txt", "r").read().split(" ")
-        index = 0
+        """loads filename.map, or the old text format from filename.txt if there is no binary map"""
 
-        # for each row
-        for each in range(self.height):
-            column = 0
-            row = []
-
-            # typecast the value to an int and decode it
-            while column < self.length:
-                value = int(save[index])
-                index += 1
-
-                # values greater than 10 stand in for multiple of the same block in a row
-                if value < 10:
-                    row.append(value)
-                    column += 1
-                else:
-                    length = value // 100
-                    material = value % (length * 100)
-                    for block in range(length):
-                        row.append(material)
-                        column += 1
-            self.world.append(row)
-
-    def generate(self, smoothness):
-        """generates the self.world matrix, which manages the terrain"""
-
-        # generation of height map vertices
-        points = []
-        peaks = []
-        horizontal = 0
-        while horizontal < self.length:
-            points.append(horizontal)
-            peaks.append(random.randint(3, 20))
-            horizontal += random.randint(1, smoothness)
-        if points[len(points) - 1] != self.length - 1:
-            points.append(self.length - 1)
-            peaks.append(random.randint(3, 10))
-
-        # extrapolation of full height map
-        heights = []
-        for point in range(len(points) - 1):
-            distance = points[point + 1] - points[point]
-            delta = (peaks[point + 1] - peaks[point]) / distance
-            for index in range(distance + 1):
-                heights.append(self.height - (int(delta * index) + peaks[point]))
-
-        # generation of world using height map
-        for level in range(self.height):
-            row = []
-            for column in range(self.length):
-                surface = heights[column]
-                if level > surface:
-                    row.append(random.randint(1, 3))
-                elif level == surface:
-                    row.append(4)
+        if os.path.exists(filename + ".map"):
+            self.replace(read_map(filename + ".map"))
+        else:
+            self.replace(read_text_map(filename + ".txt", self.length, self.height))
+
+    def save(self, filename, compress=False):
+        """writes the grid to filename.map"""
+        self.stream(0, self.length)
+        write_map(filename + ".map", self.world, compress)
+
+    def replace(self, grid):
+        """swaps in a whole new tile grid, which may be a different size"""
+
+        self.world = grid
+        self.pending = set()
+        self.close()
+        self.revision += 1
+        if grid.shape != (self.height, self.length):
+            self.height, self.length = grid.shape
+            self.chunks = Chunks(self)
+        self.chunks.mark_all()
+
+    def generate(self, smoothness, seed=None, streamed=None):
+        """generates the self.world matrix from layered noise, with hills about smoothness blocks apart
+
+        each column only depends on the seed and where it is, so big worlds are split into column ranges that
+        are generated in parallel and still come out exactly the same as when generated one after the other.
+        streamed worlds, by default those at least stream_length long, are left empty to be filled in by stream and prefetch"""
+
+        if seed is None:
+            seed = random.getrandbits(32)
+        if streamed is None:
+            streamed = self.length >= stream_length
+        self.close()
+
+        if streamed:
+            self.world = numpy.zeros((self.height, self.length), numpy.uint8)
+            self.noise = (seed, smoothness)
+            self.pending = set(range(self.chunks.columns))
+            self.revision += 1
+            self.chunks.mark_all()
+            return
+        self.pending = set()
+
+        parts = max(1, min(workers * 4, self.length // chunk_size)) if workers > 1 and self.length * self.height >= parallel_tiles else 1
+        bounds = [self.length * part // parts for part in range(parts + 1)]
+        jobs = [(seed, bounds[part], bounds[part + 1], self.height, smoothness) for part in range(parts)]
+        if parts > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                columns = list(pool.map(generate_columns, *zip(*jobs)))
+        else:
+            columns = [generate_columns(*job) for job in jobs]
+
+        self.world = numpy.concatenate(columns, axis=1)
+        self.revision += 1
+        self.chunks.mark_all()
+
+    def stream(self, left, right):
+        """generates the chunk columns overlapping block columns left to right that haven't been generated yet"""
+
+        if not self.pending:
+            return
+        size = self.chunks.size
+        generated = False
+        for column in range(max(left // size, 0), min((right - 1) // size + 1, self.chunks.columns)):
+            if column in self.pending:
+                self.pending.discard(column)
+                start = column * size
+                stop = min(start + size, self.length)
+                future = self.prefetched.pop(column, None)
+                if future is not None:
+                    tiles = future.result()
                 else:
-                    row.append(0)
-            self.world.append(row)
+                    tiles = generate_columns(self.noise[0], start, stop, self.height, self.noise[1])
+                self.world[:, start:stop] = tiles
+                self.chunks.mark_region(start, 0, stop - start, self.height)
+                generated = True
+        if generated:
+            self.revision += 1
+        if not self.pending:
+            self.close()
+
+    def prefetch(self, left, right):
+        """starts generating the pending chunk columns between block columns left and right on a pool of processes,
+        so they are ready by the time stream needs them; only worlds of at least parallel_tiles are worth the pool"""
+
+        if not self.pending or workers < 2 or self.length * self.height < parallel_tiles:
+            return
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(workers)
+        size = self.chunks.size
+        for column in range(max(left // size, 0), min((right - 1) // size + 1, self.chunks.columns)):
+            if column in self.pending and column not in self.prefetched:
+                start = column * size
+                stop = min(start + size, self.length)
+                self.prefetched[column] = self.pool.submit(generate_columns, self.noise[0], start, stop, self.height, self.noise[1])
+
+    def close(self):
+        """shuts down the prefetching pool, dropping whatever it hasn't finished"""
+
+        for future in self.prefetched.values():
+            future.cancel()
+        self.prefetched = {}
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+            self.pool = None
 
     def initialize(self):
-        """uses the self.world matrix to create Block sprites accordingly"""
-
-        for x in range(self.height):
-            for y in range(self.length):
-                material = self.world[x][y]
-                if material != 0:
-                    new_block = Block(material, y, x)
-                    self.blocks.add(new_block)
+        """renders the self.world matrix from scratch"""
+
+        self.chunks.mark_all()
         # self.calculate_collision_bounds()
 
     def destroy(self, x, y, guarantee_radius, secondary_radius):
         """with x, y at the center, guarantee radius is the radius in blocks that are always destroyed
-        secondary radius is a larger radius where blocks have a chance to be destroyed"""
+        secondary radius is a larger radius where blocks have a chance to be destroyed, falling off with distance
+        returns the (column, row) of every block that was destroyed"""
 
         x = x // 16
         y = y // 16
 
-        if 0 <= y < self.height and 0 <= x < self.length:
-            broken = self.world[y][x] != 0
+        # only the bounding box of the blast is looked at
+        reach = max(guarantee_radius, secondary_radius)
+        self.stream(x - reach + 1, x + reach)
+        rows, columns = self.clip(x - reach + 1, y - reach + 1, 2 * reach - 1, 2 * reach - 1)
+        region = self.world[rows, columns]
+        dy, dx = numpy.ogrid[rows.start - y:rows.stop - y, columns.start - x:columns.stop - x]
+        distance = numpy.sqrt(dx * dx + dy * dy)
+
+        # blocks inside the guarantee radius always break, blocks between the radii break less often further out
+        if secondary_radius > guarantee_radius:
+            chance = (secondary_radius - distance) / (secondary_radius - guarantee_radius)
         else:
-            broken = False
+            chance = numpy.zeros(distance.shape)
+        destroyed = (distance < guarantee_radius) | (self.random.random(region.shape) < chance)
+        destroyed &= region != 0
 
-        # checking through block objects and comparing their relative coordinates to determine if they should be destroyed
-        for block in self.blocks:
-            if (x - guarantee_radius) < (block.rect.x // 16) < (x + guarantee_radius) \
-                    and (y - guarantee_radius) < (block.rect.y // 16) < (y + guarantee_radius):
+        region[destroyed] = 0
+        changed = [(int(column) + columns.start, int(row) + rows.start) for row, column in numpy.argwhere(destroyed)]
+        for column, row in changed:
+            self.chunks.mark(column, row)
+        if changed:
+            self.revision += 1
 
-                try:
-                    self.world[round((block.rect.y + 4) / 16)][block.rect.x // 16] = 0
-                except KeyError or IndexError:
-                    pass
-
-                block.kill()
-
-            elif (x - secondary_radius) < (block.rect.x // 16) < (x + secondary_radius) and \
-                    (y - secondary_radius) < round((block.rect.y + 4) / 16) < (y + secondary_radius):
-
-                if random.randint(0, 2) != 0:
-                    try:
-                        self.world[round((block.rect.y + 4) / 16)][block.rect.x // 16] = 0
-                    except KeyError or IndexError:
-                        pass
-
-                    block.kill()
-
-        # self.calculate_collision_bounds()
-
-        return broken  # informing the caller whether or not any blocks were broken
+        return changed  # informing the caller which blocks, if any, were broken
 
     def place(self, x, y):
-        # add block objects to the scene
+        """fills the empty tile at x, y with dirt, returning whether it was empty"""
+
         x = x // 16
         y = y // 16
-        if self.world[y][x] == 0:
-            self.world[y][x] = 1
-            block = Block(1, x, y)
-            self.blocks.add(block)
-            # self.calculate_collision_bounds()
+        self.stream(x, x + 1)
+        if 0 <= y < self.height and 0 <= x < self.length and self.world[y, x] == 0:
+            self.world[y, x] = 1
+            self.revision += 1
+            self.chunks.mark(x, y)
             return True
         else:
             return False
+
+    def draw(self, window, area=None, offset=(0, 0)):
+        self.chunks.draw(window, area, offset)
+
+    def clip(self, x, y, width, height):
+        """the slices of the grid covered by a tile rectangle, cut down to the edges of the world"""
+        return slice(max(y, 0), max(min(y + height, self.height), 0)), slice(max(x, 0), max(min(x + width, self.length), 0))
+
+    def fill_region(self, x, y, width, height, material=1):
+        """sets every tile in the rectangle to material, returning how many tiles changed"""
+        self.stream(x, x + width)
+        rows, columns = self.clip(x, y, width, height)
+        region = self.world[rows, columns]
+        changed = int(numpy.count_nonzero(region != material))
+        region[:] = material
+        if changed:
+            self.revision += 1
+            self.chunks.mark_region(columns.start, rows.start, columns.stop - columns.start, rows.stop - rows.start)
+        return changed
+
+    def clear_region(self, x, y, width, height):
+        """empties every tile in the rectangle, returning how many tiles changed"""
+        return self.fill_region(x, y, width, height, 0)
+
+    def occupied(self, x, y, width, height):
+        """whether any tile in the rectangle is solid"""
+        self.stream(x, x + width)
+        return bool(self.world[self.clip(x, y, width, height)].any())
+
+    def surfaces(self):
+        """the row of the topmost solid tile in every column, or the world height for empty columns"""
+        self.stream(0, self.length)
+        solid = self.world != 0
+        return numpy.where(solid.any(axis=0), solid.argmax(axis=0), self.height)
+
+    def surface(self, column):
+        """the row of the topmost solid tile in a column, or the world height if it is empty"""
+        self.stream(column, column + 1)
+        solid = numpy.flatnonzero(self.world[:, column])
+        if len(solid) == 0:
+            return self.height
+        return int(solid[0])
+
+
+def read_map(path):
+    """the tile grid stored in a binary map
+
+    uncompressed maps are mapped into memory copy on write rather than read, so nothing is done per tile
+    and pages of the file are only read in as they are used"""
+
+    with open(path, "rb") as file:
+        magic, version, flags, length, height = map_header.unpack(file.read(map_header.size))
+        if magic != map_magic or version > map_version:
+            raise ValueError(path + " is not a map this version can read")
+        if flags & compressed:
+            tiles = bytearray(zlib.decompress(file.read()))
+            return numpy.frombuffer(tiles, numpy.uint8, height * length).reshape(height, length)
+    return numpy.memmap(path, numpy.uint8, "c", map_header.size, (height, length))
+
+
+def write_map(path, grid, compress=False):
+    """stores a tile grid as a binary map, replacing the file in one step so maps already loaded from it are unaffected"""
+
+    height, length = grid.shape
+    tiles = numpy.ascontiguousarray(grid, numpy.uint8).tobytes()
+    flags = 0
+    if compress:
+        tiles = zlib.compress(tiles, 9)
+        flags |= compressed
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(map_header.pack(map_magic, map_version, flags, length, height))
+        file.write(tiles)
+    os.replace(temporary, path)
+
+
+def read_text_map(path, length, height):
+    """the tile grid stored in the old text format, which doesn't record its size
+
+    values under 10 are single tiles, larger values are runs of the same tile: the hundreds are the length of
+    the run and the rest is the material"""
+
+    values = numpy.array(open(path).read().split(), numpy.int64)
+    runs = numpy.where(values < 10, 1, values // 100)
+    tiles = numpy.where(values < 10, values, values % 100)
+    return numpy.repeat(tiles, runs)[:length * height].astype(numpy.uint8).reshape(height, length)
+
+
+def convert(filename, length, height, compress=False):
+    """converts filename.txt in the old text format into filename.map"""
+    write_map(filename + ".map", read_text_map(filename + ".txt", length, height), compress)
+
+
+def scramble(values):
+    """mixes the bits of every 64 bit value in the array so that nearby inputs give unrelated outputs"""
+
+    values = (values ^ (values >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+    return values ^ (values >> numpy.uint64(31))
+
+
+def lattice(seed, *coordinates):
+    """a repeatable random number in [0, 1) for every point of integer coordinates, decided only by the seed"""
+
+    values = numpy.full(numpy.broadcast(*coordinates).shape, seed, numpy.uint64)
+    for coordinate in coordinates:
+        values = scramble(values ^ numpy.asarray(coordinate).astype(numpy.uint64))
+    return (values >> numpy.uint64(11)) * (1.0 / (1 << 53))
+
+
+def generate_columns(seed, start, stop, height, smoothness):
+    """the tiles of columns start to stop of a generated world, from the top row down"""
+
+    columns = numpy.arange(start, stop)
+
+    # each octave adds hills half as wide and half as tall as the one before
+    total = numpy.zeros(len(columns))
+    weight = 0
+    amplitude = 1.0
+    wavelength = float(smoothness)
+    for octave in range(octaves):
+        position = columns / wavelength
+        cell = numpy.floor(position).astype(numpy.int64)
+        blend = position - cell
+        blend = blend * blend * (3 - 2 * blend)
+        left = lattice(seed, octave, cell)
+        right = lattice(seed, octave, cell + 1)
+        total += (left + (right - left) * blend) * amplitude
+        weight += amplitude
+        amplitude *= persistence
+        wavelength = max(wavelength / 2, 1.0)
+
+    lowest, highest = hill_range
+    surface = height - (lowest + (total / weight * (highest - lowest + 1)).astype(numpy.int64))
+
+    # grass on the surface and a random kind of dirt under it
+    levels = numpy.arange(height).reshape(-1, 1)
+    dirt = 1 + (lattice(seed, octaves, columns, levels) * 3).astype(numpy.uint8)
+    return numpy.where(levels > surface, dirt, numpy.where(levels == surface, 4, 0)).astype(numpy.uint8)
@@ -0,0 +1,240 @@
+import pygame
+import json
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# memory budget for cached textures in bytes
+budget = 64 * 1024 * 1024
+
+# rotated copies of textures are cached separately, one for every rotation_step degrees
+rotation_budget = 16 * 1024 * 1024
+rotation_step = 2
+
+# textures listed in the manifest are decoded in the background by this many threads while the menus are up
+manifest = "assets/manifest.json"
+preload_workers = 4
+
+# index of the sprite sheets made by buildatlas.py; textures packed into them are cut out of their sheet
+atlas_index = "assets/atlas/index.json"
+
+
+class TextureCache:
+    """loads each texture from disk once and keeps it converted to the display format"""
+
+    def __init__(self, budget):
+
+        self.budget = budget
+        self.textures = OrderedDict()
+        self.usage = 0
+
+        # path -> (sheet path, rect) for textures packed into sprite sheets, read the first time it is needed
+        self.atlas = None
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def index(self):
+        if self.atlas is None:
+            try:
+                with open(atlas_index) as file:
+                    self.atlas = dict((path, (sheet, pygame.Rect(rect))) for path, (sheet, rect) in json.load(file).items())
+            except (OSError, ValueError):
+                self.atlas = {}
+        return self.atlas
+
+    def source(self, path):
+        """the file a texture is really read from: its sprite sheet if it was packed into one"""
+        place = self.index().get(path)
+        if place is not None:
+            return place[0]
+        return path
+
+    def load(self, path, alpha=False, colorkey=None):
+        """returns the texture at path, converting it with convert_alpha if alpha is True and convert otherwise"""
+
+        key = (path, alpha, colorkey)
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.hits += 1
+            self.textures.move_to_end(key)
+            return texture
+
+        self.misses += 1
+        if path in self.index():
+            return self.cut(path, alpha, colorkey)
+        texture = self.convert(pygame.image.load(path), alpha, colorkey)
+        self.store(key, texture)
+        return texture
+
+    def cut(self, path, alpha=False, colorkey=None):
+        """caches the texture at path as a view into its sprite sheet, sharing the sheet's pixels"""
+
+        sheet, rect = self.index()[path]
+        texture = self.load(sheet, alpha).subsurface(rect)
+        if colorkey is not None:
+            texture.set_colorkey(colorkey)
+        self.store((path, alpha, colorkey), texture)
+        return texture
+
+    def add(self, path, texture, alpha=False, colorkey=None):
+        """caches a texture decoded somewhere else, as if it had been loaded with the same arguments"""
+
+        key = (path, alpha, colorkey)
+        if key not in self.textures:
+            self.store(key, self.convert(texture, alpha, colorkey))
+
+    def keys(self):
+        """(path, alpha, colorkey) of every cached texture loaded from a file, leaving out sprite sheets,
+        which are only loaded for the textures packed into them"""
+        sheets = set(sheet for sheet, rect in self.index().values())
+        return [key for key in self.textures if isinstance(key[0], str) and key[0] not in sheets]
+
+    def rotate(self, texture, angle, step):
+        """returns texture rotated by angle degrees, rounded to the nearest multiple of step"""
+
+        turn = int(round(angle / step)) % int(round(360 / step))
+        key = (texture, turn)
+        rotated = self.textures.get(key)
+        if rotated is not None:
+            self.hits += 1
+            self.textures.move_to_end(key)
+            return rotated
+
+        self.misses += 1
+        rotated = pygame.transform.rotate(texture, turn * step)
+        self.store(key, rotated)
+        return rotated
+
+    def convert(self, texture, alpha, colorkey):
+        """converts a freshly decoded surface to the display format, if there is a display to convert to"""
+
+        if pygame.display.get_surface() is not None:
+            if alpha:
+                texture = texture.convert_alpha()
+            else:
+                texture = texture.convert()
+        if colorkey is not None:
+            texture.set_colorkey(colorkey)
+        return texture
+
+    def store(self, key, texture):
+        """adds a texture to the cache, evicting the least recently used ones if over budget"""
+
+        self.textures[key] = texture
+        self.usage += size(texture)
+
+        while self.usage > self.budget and len(self.textures) > 1:
+            evicted_key, evicted = self.textures.popitem(last=False)
+            self.usage -= size(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self.textures.clear()
+        self.usage = 0
+
+    def stats(self):
+        return {"textures": len(self.textures), "usage": self.usage, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class Preloader:
+    """decodes textures on a pool of threads, then hands them to a cache a few at a time on the main thread,
+    which is the only one allowed to convert them to the display format"""
+
+    def __init__(self, entries, cache, workers):
+
+        self.cache = cache
+        self.done = 0
+
+        # file -> the entries read from it, since many textures can come from one sprite sheet
+        self.files = {}
+        for entry in entries:
+            self.files.setdefault(cache.source(entry[0]), []).append(entry)
+        self.total = len(self.files)
+
+        # (file, future) pairs for files that have finished decoding
+        self.decoded = queue.Queue()
+
+        pool = ThreadPoolExecutor(workers)
+        for filename in self.files:
+            future = pool.submit(pygame.image.load, filename)
+            future.add_done_callback(lambda future, filename=filename: self.decoded.put((filename, future)))
+        pool.shutdown(wait=False)
+
+    def step(self, budget=.004):
+        """moves decoded textures into the cache for up to budget seconds, returning the progress"""
+
+        start = time.perf_counter()
+        while time.perf_counter() - start < budget:
+            try:
+                filename, future = self.decoded.get_nowait()
+            except queue.Empty:
+                break
+            self.done += 1
+
+            # textures that fail to decode are left for load to report when they are really needed
+            try:
+                texture = future.result()
+            except (pygame.error, OSError):
+                continue
+            for path, alpha, colorkey in self.files[filename]:
+                if path == filename:
+                    self.cache.add(path, texture, alpha, colorkey)
+                else:
+                    self.cache.add(filename, texture, alpha)
+                    if (path, alpha, colorkey) not in self.cache.textures:
+                        self.cache.cut(path, alpha, colorkey)
+        return self.progress()
+
+    def progress(self):
+        """how much of the manifest is in the cache, from 0 to 1"""
+        if self.total == 0:
+            return 1.0
+        return self.done / self.total
+
+    def finished(self):
+        return self.done == self.total
+
+
+def size(texture):
+    """approximate memory used by a surface in bytes, which is nothing for views into another surface"""
+    if texture.get_parent() is not None:
+        return 0
+    width, height = texture.get_size()
+    return width * height * texture.get_bytesize()
+
+
+cache = TextureCache(budget)
+rotations = TextureCache(rotation_budget)
+
+
+def load(path, alpha=False, colorkey=None):
+    return cache.load(path, alpha, colorkey)
+
+
+def rotate(texture, angle):
+    return rotations.rotate(texture, angle, rotation_step)
+
+
+def preload(path=manifest, workers=preload_workers):
+    """starts decoding every texture in the manifest at path in the background"""
+
+    try:
+        with open(path) as file:
+            entries = json.load(file)
+    except (OSError, ValueError):
+        entries = []
+    entries = [(entry["path"], entry["alpha"], tuple(entry["colorkey"]) if entry["colorkey"] else None) for entry in entries]
+    return Preloader(entries, cache, workers)
+
+
+def save_manifest(path=manifest):
+    """writes every texture loaded so far to the manifest at path, so that they are all preloaded from then on"""
+
+    entries = [{"path": key[0], "alpha": key[1], "colorkey": key[2]} for key in sorted(cache.keys(), key=str)]
+    with open(path, "w") as file:
+        file.write("[\n" + ",\n".join(json.dumps(entry) for entry in entries) + "\n]\n")